@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None or item[1] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight:
+    # Collapses concurrent calls for the same key into one in-flight awaitable.
+    def __init__(self):
+        self._inflight = {}
+
+    def is_inflight(self, key):
+        return key in self._inflight
+
+    async def run(self, key, factory):
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(factory())
+        self._inflight[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(future)
+
+    def _forget(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # Mark the exception as retrieved when every waiter has gone away.
+            future.exception()
+
+
+class SQLiteStore:
+    def __init__(self, path, table="cache", maxsize=10000, ttl=86400):
+        self.path = path
+        self.table = table
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+        self._connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)")
+
+    def get(self, key):
+        now = time.time()
+        row = self._connection.execute(f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            self._connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            return None
+        self._connection.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._connection.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), expires_at, now))
+        self._evict(now)
+
+    def _evict(self, now):
+        self._connection.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (now,))
+        self._connection.execute(
+            f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY accessed_at DESC "
+            "LIMIT -1 OFFSET ?)", (self.maxsize,))
+
+    def close(self):
+        self._connection.close()
+
+
+class ResultCache:
+    HIT = "HIT"
+    MISS = "MISS"
+    SHARED = "SHARED"
+
+    def __init__(self, maxsize=256, ttl=3600, path=None, disk_maxsize=10000, table="results"):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.store = SQLiteStore(path, table=table, maxsize=disk_maxsize, ttl=ttl) if path else None
+        self._single_flight = SingleFlight()
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.store is not None:
+            value = self.store.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.store is not None:
+            self.store.set(key, value)
+
+    async def get_or_compute(self, key, factory, cacheable=None):
+        # A value for which cacheable(value) is false is shared with the concurrent callers but not cached.
+        value = self.get(key)
+        if value is not None:
+            return value, self.HIT
+        outcome = self.SHARED if self._single_flight.is_inflight(key) else self.MISS
+
+        async def compute():
+            result = await factory()
+            if cacheable is None or cacheable(result):
+                self.set(key, result)
+            return result
+
+        return await self._single_flight.run(key, compute), outcome
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+
+def make_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def normalize_text(text):
+    return " ".join(text.split())
@@ -1,11 +1,65 @@
+import math
+import re
 from collections import Counter
+from functools import cached_property, lru_cache
 from itertools import zip_longest
 
-from textstat import textstat
+from .keywords import KeywordMatcher, tokenize
 
+# Bump whenever a score formula changes so cached analyses are not reused.
+SCORING_VERSION = "5"
 
-def calculate_percentage(text, count):
-    total_sentences = textstat.sentence_count(text=text)
+# Mirrors textstat's tokenization (English, apostrophes removed) so every score matches what textstat returns.
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+SENTENCE_PATTERN = re.compile(r"\b[^.!?]+[.!?]*", re.UNICODE)
+FRE_BASE, FRE_SENTENCE_LENGTH, FRE_SYLLABLES_PER_WORD = 206.835, 1.015, 84.6
+
+
+@lru_cache(maxsize=None)
+def get_hyphenator():
+    # The same en_US dictionary textstat counts syllables with, without importing textstat and pkg_resources.
+    from pyphen import Pyphen
+
+    return Pyphen(lang="en_US")
+
+
+def legacy_round(number, points=0):
+    p = 10 ** points
+    return float(math.floor((number * p) + math.copysign(0.5, number))) / p
+
+
+class TextStats:
+    # Sentence, word and syllable counts of a document, computed once and shared by every calculator.
+    def __init__(self, text):
+        self.text = text
+        self.word_counts = Counter(text.split())
+
+        self.lexicon_count = 0
+        self.syllable_count = 0
+        hyphenator = get_hyphenator()
+        for token, frequency in self.word_counts.items():
+            if PUNCTUATION_PATTERN.sub("", token):
+                self.lexicon_count += frequency
+            for word in PUNCTUATION_PATTERN.sub("", token.lower()).split():
+                self.syllable_count += (len(hyphenator.positions(word)) + 1) * frequency
+
+        sentences = SENTENCE_PATTERN.findall(text)
+        ignore_count = sum(1 for sentence in sentences if len(PUNCTUATION_PATTERN.sub("", sentence).split()) <= 2)
+        self.sentence_count = max(1, len(sentences) - ignore_count)
+
+    @cached_property
+    def tokens(self):
+        return tokenize(self.text)
+
+    def flesch_reading_ease(self):
+        sentence_length = legacy_round(self.lexicon_count / self.sentence_count, 1)
+        syllables_per_word = legacy_round(self.syllable_count / self.lexicon_count, 1) if self.lexicon_count else 0.0
+        flesch = FRE_BASE - FRE_SENTENCE_LENGTH * sentence_length - FRE_SYLLABLES_PER_WORD * syllables_per_word
+        return legacy_round(flesch, 2)
+
+
+def calculate_percentage(text_stats, count):
+    total_sentences = text_stats.sentence_count
     percentage = count / total_sentences * 100
     processed_percentage = 100 if percentage >= 100 else percentage
     return processed_percentage
@@ -32,9 +86,10 @@ def calculate_ats_keyword_score(keyword_score, category_keyword_score,
     return ats_keyword_score
 
 
-def calculate_keyword_stuffing_score(text, keywords, category_keywords):
-    total_words = textstat.lexicon_count(text=text)
-    word_counts = Counter(text.split())
+def calculate_keyword_stuffing_score(text_stats, keywords, category_keywords):
+    keywords, category_keywords = keywords or [], category_keywords or []
+    total_words = text_stats.lexicon_count
+    word_counts = KeywordMatcher(keywords + category_keywords).count(text_stats.tokens)
     keyword_frequency = {keyword: word_counts[keyword] / total_words for keyword in keywords}
     category_keyword_frequency = {category_keyword: word_counts[category_keyword] / total_words for category_keyword in
                                   category_keywords}
@@ -52,8 +107,8 @@ def calculate_keyword_stuffing_score(text, keywords, category_keywords):
     return sum(keyword_stuffing_score), sum(category_keyword_stuffing_score)
 
 
-def get_readability_score(text):
-    readability_score = textstat.flesch_reading_ease(text=text)
+def get_readability_score(text_stats):
+    readability_score = text_stats.flesch_reading_ease()
     processed_readability_score = 50 if readability_score > 50 else readability_score
     return processed_readability_score
 
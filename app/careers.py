@@ -0,0 +1,67 @@
+from decouple import config
+
+from .cache import ResultCache, make_key
+from .deadlines import FALLBACK
+from .keywords import KeywordMatcher
+from .schemas import CareerProfile, SecondATS
+
+CAREER_PROFILE_CACHE_SIZE = config("CAREER_PROFILE_CACHE_SIZE", default=512, cast=int)
+CAREER_PROFILE_CACHE_TTL = config("CAREER_PROFILE_CACHE_TTL", default=30 * 24 * 60 * 60, cast=int)
+CAREER_PROFILE_CACHE_PATH = config("CAREER_PROFILE_CACHE_PATH", default="")
+# Bump when the shape of cached profiles changes.
+CAREER_PROFILE_CACHE_VERSION = "2"
+MAX_KEYWORDS_TO_ADD = 15
+
+
+def normalize_career_name(career_name):
+    return " ".join(career_name.split()).casefold()
+
+
+class CareerProfileStore:
+    # One generated keyword profile per normalized career name, kept in an LRU and optionally in SQLite.
+    def __init__(self, version, path=None):
+        self.version = version
+        self.cache = ResultCache(maxsize=CAREER_PROFILE_CACHE_SIZE, ttl=CAREER_PROFILE_CACHE_TTL, path=path,
+                                 table="career_profiles")
+
+    async def get(self, career_name, generate):
+        # generate returns (profile, outcome) and so does get; profiles from the fallback model are not cached.
+        async def compute():
+            profile, outcome = await generate(career_name)
+            return profile.dict(), outcome
+
+        key = make_key("career_profile", CAREER_PROFILE_CACHE_VERSION, self.version,
+                       normalize_career_name(career_name))
+        (profile, outcome), _ = await self.cache.get_or_compute(key, compute,
+                                                                cacheable=lambda value: value[1] != FALLBACK)
+        return CareerProfile(**profile), outcome
+
+    def close(self):
+        self.cache.close()
+
+
+def match_career_profile(profile, tokens, experience):
+    # Counts the profile keywords present in the resume tokens and suggests the missing ones.
+    profile_action_verbs = list(dict.fromkeys(profile.action_verbs))
+    profile_professional_terms = list(dict.fromkeys(profile.professional_terms))
+    profile_tools = list(dict.fromkeys(profile.tools))
+    action_verbs = KeywordMatcher(profile_action_verbs).count(tokens)
+    professional_terms = KeywordMatcher(profile_professional_terms).count(tokens)
+    tools = KeywordMatcher(profile_tools).count(tokens)
+
+    keywords = [keyword for keyword in profile_action_verbs if action_verbs[keyword]]
+    general_keywords = [keyword for keyword in profile_professional_terms if professional_terms[keyword]]
+    category_keywords = [keyword for keyword in profile_tools if tools[keyword]]
+    return SecondATS(
+        keyword_count=len(keywords),
+        keywords=keywords,
+        job_title_count=experience.job_title_count,
+        general_keyword_count=len(general_keywords),
+        category_keyword_count=len(category_keywords),
+        category_keywords=category_keywords,
+        total_work_experience_count=experience.total_work_experience_count,
+        ats_keywords_to_add=[keyword for keyword in profile_action_verbs
+                             if not action_verbs[keyword]][:MAX_KEYWORDS_TO_ADD],
+        general_keywords_to_add=[keyword for keyword in profile_professional_terms
+                                 if not professional_terms[keyword]][:MAX_KEYWORDS_TO_ADD],
+    )
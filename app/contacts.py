@@ -0,0 +1,103 @@
+import re
+
+from app.schemas import FirstATS
+
+
+YES = "Yes"
+NO = "No"
+
+EMAIL_PATTERN = re.compile(r"[\w.+\-]+@[\w\-]+(?:\.[\w\-]+)*\.[a-z]{2,}", re.IGNORECASE)
+# john [at] example [dot] com, john(at)example(dot)com, john [at] example.com. The bare "at"/"dot" spelling is left out,
+# it matches ordinary prose such as "Developer at Microsoft dot NET".
+OBFUSCATED_EMAIL_PATTERN = re.compile(
+    r"[\w.+\-]+\s*[\[(<{]\s*at\s*[\])>}]\s*[\w\-]+"
+    r"(?:\s*(?:[\[(<{]\s*dot\s*[\])>}]|\.)\s*[\w\-]+)+",
+    re.IGNORECASE)
+
+PHONE_PATTERN = re.compile(r"(?<![\w+])(?:\+|00)?\(?\d[\d \t().\-/]{5,}\d(?!\w)")
+PHONE_CONTEXT_PATTERN = re.compile(r"(?:phone|tel|telephone|mobile|cell|whatsapp|contact)\W{0,5}$", re.IGNORECASE)
+CURRENCY_PATTERN = re.compile(r"[$€£¥]\s?$")
+# A year or a month and year in either order: 2015, 06/2015, 2015.06
+MONTH_YEAR = r"(?:(?:0?[1-9]|1[0-2])[./\-]\s?)?(?:19|20)\d{2}(?:[./\-](?:0?[1-9]|1[0-2]))?"
+DATE_RANGE_PATTERN = re.compile(rf"^{MONTH_YEAR}\s*[-/]?\s*{MONTH_YEAR}$")
+DATE_PATTERN = re.compile(r"^\d{1,4}[./\-]\d{1,2}[./\-]\d{1,4}$")
+ZIP_PATTERN = re.compile(r"^\d{5}-\d{4}$")
+THOUSANDS_PATTERN = re.compile(r"^\d{1,3}(?:[ .]\d{3})+$")
+GROUPED_PHONE_PATTERN = re.compile(r"^\(?\d{2,4}\)?[\s.\-]\d{3,4}[\s.\-]\d{3,4}$")
+# National numbers with a trunk 0: 07911 123456, 030 1234567, 06 12 34 56 78, 0612345678
+NATIONAL_PHONE_PATTERN = re.compile(r"^\(?0[1-9]\d{0,4}\)?(?:[\s.\-/]?\d{2,5}){1,4}$")
+NATIONAL_PHONE_DIGITS = range(9, 13)
+# Contact details sit at the top of a resume, where an ungrouped national number is accepted too.
+HEADER_CHARACTERS = 300
+
+LINKEDIN_URL_PATTERN = re.compile(r"linkedin\.com/(?:in|pub)/[\w\-%.]+", re.IGNORECASE)
+LINKEDIN_MENTION_PATTERN = re.compile(r"\blinked\s?in\b", re.IGNORECASE)
+
+
+def detect_email(text):
+    if EMAIL_PATTERN.search(text) or OBFUSCATED_EMAIL_PATTERN.search(text):
+        return YES
+    return NO
+
+
+def is_date(candidate):
+    candidate = candidate.strip("()[] ")
+    return bool(DATE_RANGE_PATTERN.match(candidate) or DATE_PATTERN.match(candidate))
+
+
+def detect_phone(text):
+    ambiguous = False
+    for match in PHONE_PATTERN.finditer(text):
+        candidate = match.group().strip()
+        digits = re.sub(r"\D", "", candidate)
+        preceding = text[max(0, match.start() - 20):match.start()]
+        if not 7 <= len(digits) <= 15 or is_date(candidate) or CURRENCY_PATTERN.search(preceding):
+            continue
+        if candidate.startswith(("+", "00")) or PHONE_CONTEXT_PATTERN.search(preceding):
+            return YES
+        if (NATIONAL_PHONE_PATTERN.match(candidate) and len(digits) in NATIONAL_PHONE_DIGITS
+                and (not candidate.isdigit() or match.start() < HEADER_CHARACTERS)):
+            return YES
+        # Unlabelled numbers need the grouping of a phone number; plain digit runs, ZIP+4 codes and amounts don't count.
+        if candidate.isdigit() or ZIP_PATTERN.match(candidate) or THOUSANDS_PATTERN.match(candidate):
+            continue
+        if GROUPED_PHONE_PATTERN.match(candidate):
+            return YES
+        ambiguous = True
+    return None if ambiguous else NO
+
+
+def detect_linkedin(text):
+    if LINKEDIN_URL_PATTERN.search(text):
+        return YES
+    # The word alone is usually a hyperlink whose target was lost when the text was extracted.
+    if LINKEDIN_MENTION_PATTERN.search(text):
+        return None
+    return NO
+
+
+def detect_contacts(text):
+    # Returns Yes/No per field, or None where the text alone is not conclusive.
+    return {
+        "email_score": detect_email(text),
+        "phone_score": detect_phone(text),
+        "linkedin_score": detect_linkedin(text),
+    }
+
+
+def is_ambiguous(contacts):
+    return any(value is None for value in contacts.values())
+
+
+# Answers for ambiguous fields when the LLM fallback is off or fails. A number without a label or phone grouping is
+# not counted, while a bare "LinkedIn" is nearly always a hyperlink whose URL was lost when the text was extracted.
+AMBIGUOUS_DEFAULTS = {"email_score": NO, "phone_score": NO, "linkedin_score": YES}
+
+
+def resolve_contacts(contacts, fallback=None):
+    resolved = {}
+    for field, value in contacts.items():
+        if value is None:
+            value = getattr(fallback, field) if fallback is not None else AMBIGUOUS_DEFAULTS[field]
+        resolved[field] = value
+    return FirstATS(**resolved)
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from decouple import config
+
+from .metrics import Counter, register
+
+CHAIN_DEADLINE = config("CHAIN_DEADLINE", default=60.0, cast=float)
+# Per-chain overrides, e.g. "analyze_second=45,career_profile=90".
+CHAIN_DEADLINES = config("CHAIN_DEADLINES", default="",
+                         cast=lambda value: {name.strip(): float(seconds) for name, seconds in
+                                             (item.split("=") for item in value.split(",") if item.strip())})
+CHAIN_HEDGING = config("CHAIN_HEDGING", default=False, cast=bool)
+HEDGE_QUANTILE = config("HEDGE_QUANTILE", default=0.95, cast=float)
+HEDGE_MIN_SAMPLES = config("HEDGE_MIN_SAMPLES", default=20, cast=int)
+# Stand-in for a chain's latency quantile until HEDGE_MIN_SAMPLES calls have been timed.
+HEDGE_DEFAULT_DELAY = config("HEDGE_DEFAULT_DELAY", default=15.0, cast=float)
+LATENCY_WINDOW = 200
+
+OK = "ok"
+HEDGED = "hedged"
+FALLBACK = "fallback"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+logger = logging.getLogger(__name__)
+
+
+class ChainError(Exception):
+    def __init__(self, chain, status):
+        super().__init__(chain, status)
+        self.chain = chain
+        self.status = status
+
+
+class LatencyTracker:
+    # Rolling window of successful call durations per chain and model.
+    def __init__(self, window=LATENCY_WINDOW, min_samples=HEDGE_MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._samples = {}
+        self._window = window
+
+    def observe(self, key, seconds):
+        self._samples.setdefault(key, deque(maxlen=self._window)).append(seconds)
+
+    def quantile(self, key, fraction=HEDGE_QUANTILE, default=HEDGE_DEFAULT_DELAY):
+        samples = self._samples.get(key)
+        if not samples or len(samples) < self.min_samples:
+            return default
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+latency_tracker = LatencyTracker()
+chain_outcomes = register(Counter("resume_chain_outcomes_total",
+                                  "Chain calls by outcome: ok, hedged, fallback, timeout or error"))
+
+
+def get_deadline(chain):
+    return CHAIN_DEADLINES.get(chain, CHAIN_DEADLINE)
+
+
+async def run_with_deadline(chain, primary, fallback=None, deadline=None, hedging=CHAIN_HEDGING):
+    # primary() and fallback() each start one attempt. A second attempt starts when the primary is slower than its
+    # usual quantile (hedging), when it fails, or when only the faster fallback model can still make the deadline.
+    # The first success wins and the other attempt is cancelled. Returns the result with the kind of attempt that
+    # produced it (ok, hedged or fallback); ChainError is raised when neither succeeds in time.
+    started = time.monotonic()
+    deadline_at = started + (get_deadline(chain) if deadline is None else deadline)
+    if hedging:
+        second_at = started + latency_tracker.quantile((chain, "primary"))
+    elif fallback is not None:
+        second_at = deadline_at - latency_tracker.quantile((chain, "fallback"))
+    else:
+        second_at = None
+    attempts = {asyncio.ensure_future(primary()): (OK, started)}
+    try:
+        while attempts:
+            now = time.monotonic()
+            wake_at = deadline_at if second_at is None else min(deadline_at, second_at)
+            done, _ = await asyncio.wait(attempts, timeout=max(wake_at - now, 0),
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                kind, attempt_started = attempts.pop(attempt)
+                if attempt.exception() is None:
+                    latency_tracker.observe((chain, "fallback" if kind == FALLBACK else "primary"),
+                                            time.monotonic() - attempt_started)
+                    chain_outcomes.inc(chain=chain, outcome=kind)
+                    return attempt.result(), kind
+                logger.warning("Chain %s %s attempt failed", chain, kind, exc_info=attempt.exception())
+
+            now = time.monotonic()
+            if now >= deadline_at:
+                break
+            if second_at is not None and (now >= second_at or not attempts):
+                second_at = None
+                remaining = deadline_at - now
+                at_risk = remaining < latency_tracker.quantile((chain, "primary"))
+                if fallback is not None and (at_risk or not hedging):
+                    attempts[asyncio.ensure_future(fallback())] = (FALLBACK, now)
+                else:
+                    attempts[asyncio.ensure_future(primary())] = (HEDGED, now)
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
+
+    status = TIMEOUT if time.monotonic() >= deadline_at else ERROR
+    chain_outcomes.inc(chain=chain, outcome=status)
+    raise ChainError(chain, status)
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+
+from decouple import config
+
+from .cache import make_key
+
+JOB_WORKERS = config("JOB_WORKERS", default=4, cast=int)
+JOB_MAX_QUEUE = config("JOB_MAX_QUEUE", default=100, cast=int)
+JOB_STORE_PATH = config("JOB_STORE_PATH", default="")
+JOB_TTL = config("JOB_TTL", default=24 * 60 * 60, cast=int)
+OPENAI_TOKENS_PER_MINUTE = config("OPENAI_TOKENS_PER_MINUTE", default=80000, cast=int)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class TokenBucket:
+    # Refills continuously at tokens_per_minute; a request larger than the bucket waits for a full bucket.
+    def __init__(self, tokens_per_minute):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60
+        self.tokens = tokens_per_minute
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens):
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+
+class JobStore:
+    # Jobs live in SQLite, on disk when JOB_STORE_PATH is set so queued work survives a restart, else in memory.
+    def __init__(self, path=None):
+        self._connection = sqlite3.connect(path or ":memory:", check_same_thread=False, isolation_level=None)
+        if path:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+            "owner TEXT NOT NULL, payload TEXT, result TEXT, error TEXT, created_at REAL NOT NULL, "
+            "updated_at REAL NOT NULL, partial TEXT)")
+        # Stores created before partial results were recorded.
+        if "partial" not in {row[1] for row in self._connection.execute("PRAGMA table_info(jobs)")}:
+            self._connection.execute("ALTER TABLE jobs ADD COLUMN partial TEXT")
+
+    def create(self, kind, owner, payload):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connection.execute(
+            "INSERT INTO jobs (id, kind, status, owner, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, owner, json.dumps(payload), now, now))
+        return job_id
+
+    def get(self, job_id):
+        row = self._connection.execute(
+            "SELECT id, kind, status, owner, result, error, created_at, updated_at, partial FROM jobs WHERE id = ?",
+            (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {"job_id": row[0], "kind": row[1], "status": row[2], "owner": row[3],
+               "result": json.loads(row[4]) if row[4] is not None else None, "error": row[5],
+               "created_at": row[6], "updated_at": row[7]}
+        if row[8] is not None:
+            job["partial"] = json.loads(row[8])
+        return job
+
+    def get_payload(self, job_id):
+        row = self._connection.execute("SELECT kind, payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0], json.loads(row[1])
+
+    def set_status(self, job_id, status, result=None, error=None, partial=None):
+        # The payload is dropped once the job has finished.
+        finished = status in (DONE, FAILED)
+        self._connection.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, partial = ?, updated_at = ?, "
+            "payload = CASE WHEN ? THEN NULL ELSE payload END WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error,
+             json.dumps(partial) if partial else None, time.time(), finished, job_id))
+
+    def unfinished(self):
+        rows = self._connection.execute(
+            "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)).fetchall()
+        return [row[0] for row in rows]
+
+    def purge(self, ttl):
+        self._connection.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                                 (DONE, FAILED, time.time() - ttl))
+
+    def close(self):
+        self._connection.close()
+
+
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS, max_queue=JOB_MAX_QUEUE, path=None,
+                 tokens_per_minute=OPENAI_TOKENS_PER_MINUTE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.store = JobStore(path)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._handlers = {}
+        self._queue = None
+        self._tasks = []
+        self._events = {}
+
+    def register(self, kind, handler, estimate_tokens):
+        # handler(payload) returns a JSON-serializable result and a map of its missing sections (empty when complete);
+        # await estimate_tokens(payload) sizes the token bucket.
+        self._handlers[kind] = (handler, estimate_tokens)
+
+    def start(self, ready=None):
+        # Jobs are accepted right away, but workers only pick them up once the ready future (the warm-up) is done.
+        self._queue = asyncio.Queue()
+        for job_id in self.store.unfinished():
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker(ready)) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.close()
+
+    def submit(self, kind, authorization, payload):
+        if self._queue is None or self._queue.qsize() >= self.max_queue:
+            raise QueueFull()
+        self.store.purge(JOB_TTL)
+        job_id = self.store.create(kind, make_key("owner", authorization), payload)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    def get(self, job_id, authorization):
+        job = self.store.get(job_id)
+        if job is None or job.pop("owner") != make_key("owner", authorization):
+            return None
+        return job
+
+    async def wait(self, job_id, timeout):
+        job = self.store.get(job_id)
+        if job is None or job["status"] in (DONE, FAILED):
+            return
+        event = self._events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self, ready):
+        if ready is not None:
+            await asyncio.wait([ready])
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+                event = self._events.pop(job_id, None)
+                if event is not None:
+                    event.set()
+
+    async def _run(self, job_id):
+        kind, payload = self.store.get_payload(job_id)
+        handler, estimate_tokens = self._handlers[kind]
+        try:
+            await self.token_bucket.acquire(await estimate_tokens(payload))
+            self.store.set_status(job_id, RUNNING)
+            result, partial = await handler(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Job %s failed", job_id)
+            self.store.set_status(job_id, FAILED, error="Processing failed")
+        else:
+            self.store.set_status(job_id, DONE, result=result, partial=partial)
@@ -0,0 +1,79 @@
+import re
+from collections import Counter, deque
+
+# Keeps tool names such as C++, C# and Node.js together as one token, but splits on "/" and "-" so that Python/SQL and
+# machine-learning match SQL and Machine Learning. Keywords go through the same split, so CI/CD matches as two tokens.
+TOKEN_PATTERN = re.compile(r"[\w+#]+(?:[.'][\w+#]+)*")
+
+
+def tokenize(text):
+    return [(match.group().casefold(), match.start(), match.end()) for match in TOKEN_PATTERN.finditer(text)]
+
+
+def normalize_keyword(keyword):
+    return tuple(token for token, _, _ in tokenize(keyword))
+
+
+class KeywordMatcher:
+    # Word-level Aho-Corasick automaton: finds every keyword, single or multi-word, in one pass over the tokens.
+    def __init__(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._keywords = {}
+        for keyword in keywords:
+            pattern = normalize_keyword(keyword)
+            if not pattern:
+                continue
+            if pattern not in self._keywords:
+                self._keywords[pattern] = []
+                self._add_pattern(pattern)
+            self._keywords[pattern].append(keyword)
+        self._build_fail_links()
+
+    def _add_pattern(self, pattern):
+        state = 0
+        for token in pattern:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][token] = next_state
+            state = next_state
+        self._output[state].append(pattern)
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(token, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, tokens):
+        # Yields (pattern, start, end) character offsets for every match in tokens from tokenize().
+        state = 0
+        for index, (token, _, end) in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for pattern in self._output[state]:
+                yield pattern, tokens[index - len(pattern) + 1][1], end
+
+    def positions(self, tokens):
+        positions = {keyword: [] for keywords in self._keywords.values() for keyword in keywords}
+        for pattern, start, end in self.find(tokens):
+            for keyword in self._keywords[pattern]:
+                positions[keyword].append((start, end))
+        return positions
+
+    def count(self, tokens):
+        pattern_counts = Counter(pattern for pattern, _, _ in self.find(tokens))
+        return Counter({keyword: pattern_counts[pattern]
+                        for pattern, keywords in self._keywords.items() for keyword in keywords})
@@ -1,112 +1,482 @@
-from typing import Annotated, Union
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Annotated, List, Union
 
-import requests
-from fastapi import FastAPI, UploadFile, File, status, Form, Header, Response
+from decouple import config
+from fastapi import FastAPI, UploadFile, File, status, Form, Header, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 
-from pypdf import PdfReader
-from docx import Document as Doc
-from langchain_core.documents.base import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from .calculators import get_hyphenator, get_readability_level, get_contact_score, calculate_ats_keyword_score, \
+    get_readability_score, calculate_job_title_score, calculate_percentage, calculate_keyword_stuffing_score, TextStats, \
+    SCORING_VERSION
+from .cache import ResultCache, make_key, normalize_text
+from .careers import normalize_career_name
+from .deadlines import OK
+from .jobs import JobQueue, QueueFull, JOB_STORE_PATH
+from .metrics import Counter, register, render, request_timings, server_timing, stage
+from .parsing import DocumentError, check_doc_type, shutdown_executor, warm_up_executor
+from .prompts import extract_resume_schema, analyze_resume_schema, stream_resume_schema, prepare_analysis, \
+    analyze_career, settle, get_number_of_tokens, load_encoding, init_pipelines, close_pipelines, KEYWORDS_SECTION, \
+    PROMPT_VERSION, EMBEDDING_MODEL, EXTRACT_MODEL, ANALYZE_MODEL, CONTACT_LLM_FALLBACK, CAREER_PROFILES, \
+    EXTRACT_SECTIONS
+from .verification import is_authorized, close_client
 
-from .calculators import get_readability_level, get_contact_score, calculate_ats_keyword_score, \
-    get_readability_score, calculate_job_title_score, calculate_percentage, calculate_keyword_stuffing_score
-from .prompts import extract_resume_schema, analyze_resume_schema
 
-app = FastAPI()
+RESULT_CACHE_SIZE = config("RESULT_CACHE_SIZE", default=256, cast=int)
+RESULT_CACHE_TTL = config("RESULT_CACHE_TTL", default=24 * 60 * 60, cast=int)
+RESULT_CACHE_PATH = config("RESULT_CACHE_PATH", default="")
+RESULT_CACHE_DISK_SIZE = config("RESULT_CACHE_DISK_SIZE", default=10000, cast=int)
+BATCH_MAX_CAREERS = config("BATCH_MAX_CAREERS", default=10, cast=int)
+BATCH_CONCURRENCY = config("BATCH_CONCURRENCY", default=3, cast=int)
+# Rough size of a prompt template and its completion, used to charge jobs against the tokens-per-minute budget.
+JOB_PROMPT_OVERHEAD_TOKENS = config("JOB_PROMPT_OVERHEAD_TOKENS", default=1500, cast=int)
+JOB_MAX_WAIT = 30
+# Bump when the shape of cached /generate/ and /analyze/ results changes.
+RESULT_CACHE_VERSION = "2"
+WARM_UP_MAX_RETRY_DELAY = 60
+# Adds a Server-Timing header with the stage latencies to every response; clients can also opt in per request.
+SERVER_TIMING = config("SERVER_TIMING", default=False, cast=bool)
 
+logger = logging.getLogger(__name__)
 
-URL = "https://quick-apply-b4e936c5c50c.herokuapp.com/api/v1/users/verifications"
+result_cache = ResultCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, path=RESULT_CACHE_PATH or None,
+                           disk_maxsize=RESULT_CACHE_DISK_SIZE)
+job_queue = JobQueue(path=JOB_STORE_PATH or None)
+warm_up_task = None
+result_cache_lookups = register(Counter("resume_result_cache_total", "Result cache lookups of /generate/ and /analyze/"))
 
 
-def check_doc_type(document: Annotated[UploadFile, File()]):
-    if document.content_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-        docs = Doc(document.file)
-        paragraphs = [paragraph.text for paragraph in docs.paragraphs]
-        texts = " ".join(paragraphs)
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=3000,
-            chunk_overlap=20,
-            length_function=len,
-            is_separator_regex=False
-        )
-        pages = text_splitter.create_documents([texts])
-        return pages, texts
-    elif document.content_type == "application/pdf":
-        reader = PdfReader(document.file)
-        pages = [Document(page_content=page.extract_text()) for page_number, page in enumerate(reader.pages)]
-        texts = " ".join(page.page_content for page in pages)
-        return pages, texts
+async def warm_up():
+    started = time.perf_counter()
+
+    async def init_pipelines_until_ready():
+        # The tokenizer and query embeddings need OpenAI and the tiktoken download, which can fail for a while
+        # after a deploy; /ready keeps answering 503 until they load.
+        delay = 1
+        while True:
+            try:
+                return await init_pipelines()
+            except Exception:
+                logger.warning("Could not warm up the tokenizer and retrieval query embeddings, retrying in %s "
+                               "seconds", delay, exc_info=True)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WARM_UP_MAX_RETRY_DELAY)
+
+    await asyncio.gather(init_pipelines_until_ready(), warm_up_executor(), asyncio.to_thread(get_hyphenator))
+    logger.info("Warm-up finished in %.2f seconds", time.perf_counter() - started)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global warm_up_task
+    # The server accepts connections right away; /ready fails until the warm-up is done.
+    warm_up_task = asyncio.create_task(warm_up())
+    job_queue.start(ready=warm_up_task)
+    yield
+    warm_up_task.cancel()
+    await asyncio.gather(warm_up_task, return_exceptions=True)
+    await job_queue.stop()
+    await close_client()
+    await close_pipelines()
+    shutdown_executor()
+    result_cache.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next):
+    if not SERVER_TIMING and request.headers.get("X-Server-Timing") != "1":
+        return await call_next(request)
+    timings = []
+    token = request_timings.set(timings)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        request_timings.reset(token)
+    # Streaming responses only report the stages that finished before the first byte.
+    response.headers["Server-Timing"] = server_timing(timings + [("total", time.perf_counter() - started)])
+    return response
+
+
+@app.exception_handler(DocumentError)
+async def document_error_handler(request: Request, exc: DocumentError):
+    return JSONResponse(status_code=exc.status_code,
+                        content={"data": "Error", "status": exc.status_code, "message": exc.message})
+
+
+def is_complete(value):
+    # Results are computed as (result, partial) pairs; those with missing or fallback sections are not cached.
+    return not value[1]
+
+
+def generate_cache_key(text):
+    return make_key("generate", RESULT_CACHE_VERSION, PROMPT_VERSION, EMBEDDING_MODEL, EXTRACT_MODEL,
+                    normalize_text(text))
+
+
+def analyze_cache_key(text, career_name):
+    return make_key("analyze", RESULT_CACHE_VERSION, PROMPT_VERSION, SCORING_VERSION, EMBEDDING_MODEL, EXTRACT_MODEL,
+                    ANALYZE_MODEL, CONTACT_LLM_FALLBACK, CAREER_PROFILES, normalize_career_name(career_name),
+                    normalize_text(text))
+
+
+def format_event(event, data, server_sent_events):
+    if server_sent_events:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, **data}) + "\n"
+
+
+def streaming_response(events, server_sent_events, headers):
+    media_type = "text/event-stream" if server_sent_events else "application/x-ndjson"
+    return StreamingResponse(events, status_code=status.HTTP_201_CREATED, media_type=media_type, headers=headers)
+
+
+def score_resume(text_stats, results):
+    email_score, phone_score, linkedin_score = results[0].email_score, results[0].phone_score, results[0].linkedin_score
+    contact_info = get_contact_score(email_score=email_score, phone_score=phone_score, linkedin_score=linkedin_score)
+    if results[1] is None:
+        # The keyword chains missed their deadline: only the scores that need no LLM are returned.
+        readability_score = get_readability_score(text_stats=text_stats)
+        return {
+            "email_score": email_score,
+            "phone_score": phone_score,
+            "linkedin_score": linkedin_score,
+            "contact_info_score": contact_info,
+            "keyword_score": None,
+            "keyword_stuffing_score": None,
+            "category_keyword_score": None,
+            "category_keyword_stuffing_score": None,
+            "general_keyword_score": None,
+            "job_title_score": None,
+            "readability_score": readability_score,
+            "readability_level": get_readability_level(readability_score=readability_score),
+            "ats_keyword_score": None,
+            "ats_keywords_to_add": [],
+            "general_keywords_to_add": [],
+        }
+
+    keywords, keyword_count, job_title_count, general_keyword_count, category_keywords, category_keyword_count, total_work_experience_count\
+        = (results[1].keywords, results[1].keyword_count, results[1].job_title_count, results[1].general_keyword_count,
+           results[1].category_keywords, results[1].category_keyword_count, results[1].total_work_experience_count)
+
+    keyword_score = calculate_percentage(text_stats=text_stats, count=keyword_count)
+    general_keyword_score = calculate_percentage(text_stats=text_stats, count=general_keyword_count)
+    category_keyword_score = calculate_percentage(text_stats=text_stats, count=category_keyword_count)
+    keyword_stuffing_score, category_keyword_stuffing_score = (
+        calculate_keyword_stuffing_score(text_stats=text_stats, keywords=keywords, category_keywords=category_keywords))
+
+    job_title_score = calculate_job_title_score(job_title_count=job_title_count,
+                                                total_work_experience_count=total_work_experience_count)
+
+    readability_score = get_readability_score(text_stats=text_stats)
+    readability_level = get_readability_level(readability_score=readability_score)
+
+    ats_keyword_score = calculate_ats_keyword_score(
+        keyword_score=keyword_score,
+        category_keyword_score=category_keyword_score, general_keyword_score=general_keyword_score,
+        email_score=email_score, phone_score=phone_score, linkedin_score=linkedin_score,
+        job_title_score=job_title_score, readability_score=readability_score,
+        keyword_stuffing_score=keyword_stuffing_score, category_keyword_stuffing_score=category_keyword_stuffing_score
+    )
+    result = {
+        "email_score": email_score,
+        "phone_score": phone_score,
+        "linkedin_score": linkedin_score,
+        "contact_info_score": contact_info,
+
+        "keyword_score": keyword_score,
+        # "keywords": keywords,
+        "keyword_stuffing_score": keyword_stuffing_score,
+        "category_keyword_score": category_keyword_score,
+        # "category_keywords": category_keywords,
+        "category_keyword_stuffing_score": category_keyword_stuffing_score,
+        "general_keyword_score": general_keyword_score,
+        "job_title_score": job_title_score,
+
+        "readability_score": readability_score,
+
+        "readability_level": readability_level,
+
+        "ats_keyword_score": ats_keyword_score,
+
+        "ats_keywords_to_add": results[1].ats_keywords_to_add,
+        "general_keywords_to_add": results[1].general_keywords_to_add,
+    }
+    return result
+
+
+async def run_generate(pages, text, headers):
+    async def generate():
+        sections, partial, context_mode = await extract_resume_schema(pages=pages)
+        headers["X-Context-Mode"] = context_mode
+        return [None if section is None else section.dict() for section in sections], partial
+
+    (result, partial), cache_status = await result_cache.get_or_compute(generate_cache_key(text), generate,
+                                                                        cacheable=is_complete)
+    result_cache_lookups.inc(endpoint="generate", result=cache_status)
+    headers["X-Cache"] = cache_status
+    return result, partial
+
+
+async def run_analyze(pages, text, career_name, headers):
+    async def analyze():
+        text_stats = TextStats(text)
+        results, partial, context_mode = await analyze_resume_schema(pages=pages, career_name=career_name,
+                                                                     text_stats=text_stats)
+        headers["X-Context-Mode"] = context_mode
+        with stage("calculators"):
+            result = score_resume(text_stats=text_stats, results=results)
+        return result, partial
+
+    (result, partial), cache_status = await result_cache.get_or_compute(analyze_cache_key(text, career_name),
+                                                                        analyze, cacheable=is_complete)
+    result_cache_lookups.inc(endpoint="analyze", result=cache_status)
+    headers["X-Cache"] = cache_status
+    return result, partial
+
+
+def created(result, partial):
+    response = {"data": result, "status": status.HTTP_201_CREATED}
+    if partial:
+        response["partial"] = partial
+    return response
 
 
 @app.post("/generate/", status_code=status.HTTP_201_CREATED)
 async def generate_resume(resume: Annotated[UploadFile, File()],
                           authorization: Annotated[Union[str, None], Header(name="Authorization")], response: Response):
-    verification_response = requests.get(url=URL, headers={"Authorization": authorization})
-    if verification_response.text == "OK":
-        pages, text = check_doc_type(resume)
-        result = await extract_resume_schema(pages=pages)
-        return {"data": result, "status": status.HTTP_201_CREATED}
+    if await is_authorized(authorization):
+        pages, text = await check_doc_type(resume)
+        result, partial = await run_generate(pages=pages, text=text, headers=response.headers)
+        return created(result, partial)
     response.status_code = status.HTTP_401_UNAUTHORIZED
     return {"data": "Error", "status": status.HTTP_401_UNAUTHORIZED, "message": "Not Authorized"}
 
 
+@app.post("/generate/stream/", status_code=status.HTTP_201_CREATED)
+async def stream_generate_resume(resume: Annotated[UploadFile, File()],
+                                 authorization: Annotated[Union[str, None], Header(name="Authorization")],
+                                 request: Request):
+    if not await is_authorized(authorization):
+        return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED,
+                            content={"data": "Error", "status": status.HTTP_401_UNAUTHORIZED,
+                                     "message": "Not Authorized"})
+    pages, text = await check_doc_type(resume)
+    server_sent_events = "text/event-stream" in request.headers.get("accept", "")
+    started = time.perf_counter()
+    key = generate_cache_key(text)
+    cached = result_cache.get(key)
+
+    if cached is not None:
+        async def events():
+            for section, data in zip(EXTRACT_SECTIONS, cached[0]):
+                yield format_event("section", {"section": section, "data": data, "status": "ok", "elapsed_ms": 0},
+                                   server_sent_events)
+            yield format_event("done", {"status": status.HTTP_201_CREATED, "elapsed_ms": 0}, server_sent_events)
+
+        return streaming_response(events(), server_sent_events, {"X-Cache": ResultCache.HIT})
+
+    context_mode, sections = await stream_resume_schema(pages)
+
+    async def events():
+        results = {}
+        partial = {}
+        try:
+            async for section, result, section_status, seconds in sections:
+                results[section] = None if result is None else result.dict()
+                if section_status != OK:
+                    partial[section] = section_status
+                yield format_event("section", {"section": section, "data": results[section], "status": section_status,
+                                               "elapsed_ms": round(seconds * 1000)}, server_sent_events)
+        except Exception:
+            logger.exception("Streaming extraction failed")
+            yield format_event("error", {"status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                                         "message": "Extraction failed"}, server_sent_events)
+            return
+        done = {"status": status.HTTP_201_CREATED, "elapsed_ms": round((time.perf_counter() - started) * 1000)}
+        if partial:
+            done["partial"] = partial
+        else:
+            result_cache.set(key, ([results[section] for section in EXTRACT_SECTIONS], {}))
+        yield format_event("done", done, server_sent_events)
+
+    return streaming_response(events(), server_sent_events,
+                              {"X-Cache": ResultCache.MISS, "X-Context-Mode": context_mode})
+
+
 @app.post("/analyze/", status_code=status.HTTP_201_CREATED)
 async def analyze_resume(resume: Annotated[UploadFile, File()], career_name: Annotated[str, Form()],
                          authorization: Annotated[Union[str, None], Header(name="Authorization")], response: Response):
-    verification_response = requests.get(url=URL, headers={"Authorization": authorization})
-    if verification_response.text == "OK":
-        pages, text = check_doc_type(resume)
-        results = await analyze_resume_schema(pages=pages, career_name=career_name)
-        email_score, phone_score, linkedin_score = results[0].email_score, results[0].phone_score, results[0].linkedin_score
-        contact_info = get_contact_score(email_score=email_score, phone_score=phone_score, linkedin_score=linkedin_score)
-
-        keywords, keyword_count, job_title_count, general_keyword_count, category_keywords, category_keyword_count, total_work_experience_count\
-            = (results[1].keywords, results[1].keyword_count, results[1].job_title_count, results[1].general_keyword_count,
-               results[1].category_keywords, results[1].category_keyword_count, results[1].total_work_experience_count)
-
-        keyword_score = calculate_percentage(text=text, count=keyword_count)
-        general_keyword_score = calculate_percentage(text=text, count=general_keyword_count)
-        category_keyword_score = calculate_percentage(text=text, count=category_keyword_count)
-        keyword_stuffing_score, category_keyword_stuffing_score = (
-            calculate_keyword_stuffing_score(text=text, keywords=keywords, category_keywords=category_keywords))
-
-        job_title_score = calculate_job_title_score(job_title_count=job_title_count,
-                                                    total_work_experience_count=total_work_experience_count)
-
-        readability_score = get_readability_score(text=text)
-        readability_level = get_readability_level(readability_score=readability_score)
-
-        ats_keyword_score = calculate_ats_keyword_score(
-            keyword_score=keyword_score,
-            category_keyword_score=category_keyword_score, general_keyword_score=general_keyword_score,
-            email_score=email_score, phone_score=phone_score, linkedin_score=linkedin_score,
-            job_title_score=job_title_score, readability_score=readability_score,
-            keyword_stuffing_score=keyword_stuffing_score, category_keyword_stuffing_score=category_keyword_stuffing_score
-        )
-        result = {
-            "email_score": email_score,
-            "phone_score": phone_score,
-            "linkedin_score": linkedin_score,
-            "contact_info_score": contact_info,
+    if await is_authorized(authorization):
+        pages, text = await check_doc_type(resume)
+        result, partial = await run_analyze(pages=pages, text=text, career_name=career_name,
+                                            headers=response.headers)
+        return created(result, partial)
+    response.status_code = status.HTTP_401_UNAUTHORIZED
+    return {"data": "Error", "status": status.HTTP_401_UNAUTHORIZED, "message": "Not Authorized"}
 
-            "keyword_score": keyword_score,
-            # "keywords": keywords,
-            "keyword_stuffing_score": keyword_stuffing_score,
-            "category_keyword_score": category_keyword_score,
-            # "category_keywords": category_keywords,
-            "category_keyword_stuffing_score": category_keyword_stuffing_score,
-            "general_keyword_score": general_keyword_score,
-            "job_title_score": job_title_score,
 
-            "readability_score": readability_score,
+@app.post("/analyze/batch/", status_code=status.HTTP_201_CREATED)
+async def analyze_resume_batch(resume: Annotated[UploadFile, File()], career_names: Annotated[List[str], Form()],
+                               authorization: Annotated[Union[str, None], Header(name="Authorization")],
+                               request: Request):
+    if not await is_authorized(authorization):
+        return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED,
+                            content={"data": "Error", "status": status.HTTP_401_UNAUTHORIZED,
+                                     "message": "Not Authorized"})
+    unique_career_names = {}
+    for career_name in career_names:
+        if career_name.strip():
+            unique_career_names.setdefault(normalize_career_name(career_name), career_name.strip())
+    if not unique_career_names or len(unique_career_names) > BATCH_MAX_CAREERS:
+        return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            content={"data": "Error", "status": status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                     "message": f"Send between 1 and {BATCH_MAX_CAREERS} career_names"})
 
-            "readability_level": readability_level,
+    pages, text = await check_doc_type(resume)
+    server_sent_events = "text/event-stream" in request.headers.get("accept", "")
+    started = time.perf_counter()
+    text_stats = TextStats(text)
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    prepared = []
 
-            "ats_keyword_score": ats_keyword_score,
+    async def get_context():
+        # Careers whose result is not cached share one retrieval and one contact detection.
+        if not prepared:
+            prepared.append(asyncio.ensure_future(prepare_analysis(pages, text_stats)))
+        return await asyncio.shield(prepared[0])
 
-            "ats_keywords_to_add": results[1].ats_keywords_to_add,
-            "general_keywords_to_add": results[1].general_keywords_to_add,
-        }
-        return {"data": result, "status": status.HTTP_201_CREATED}
+    async def analyze(career_name):
+        async def compute():
+            context = await get_context()
+            async with semaphore:
+                second, second_status = await settle(analyze_career(context, career_name))
+            contacts = await context.contacts
+            with stage("calculators"):
+                result = score_resume(text_stats=text_stats, results=[contacts, second])
+            return result, {KEYWORDS_SECTION: second_status} if second_status != OK else {}
+
+        try:
+            (result, partial), cache_status = await result_cache.get_or_compute(
+                analyze_cache_key(text, career_name), compute, cacheable=is_complete)
+        except Exception:
+            logger.exception("Batch analysis failed for %s", career_name)
+            return {"career_name": career_name, "status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    "message": "Analysis failed", "elapsed_ms": round((time.perf_counter() - started) * 1000)}
+        outcome = {"career_name": career_name, "status": status.HTTP_201_CREATED, "data": result,
+                   "cache": cache_status, "elapsed_ms": round((time.perf_counter() - started) * 1000)}
+        if partial:
+            outcome["partial"] = partial
+        return outcome
+
+    async def events():
+        futures = [asyncio.ensure_future(analyze(career_name)) for career_name in unique_career_names.values()]
+        try:
+            for next_done in asyncio.as_completed(futures):
+                outcome = await next_done
+                yield format_event("career" if outcome["status"] == status.HTTP_201_CREATED else "error", outcome,
+                                   server_sent_events)
+        finally:
+            for future in futures:
+                future.cancel()
+        yield format_event("done", {"status": status.HTTP_201_CREATED,
+                                    "elapsed_ms": round((time.perf_counter() - started) * 1000)}, server_sent_events)
+
+    return streaming_response(events(), server_sent_events, {})
+
+
+def job_pages(payload):
+    from langchain_core.documents import Document
+
+    return [Document(page_content=page) for page in payload["pages"]]
+
+
+async def handle_generate_job(payload):
+    return await run_generate(pages=job_pages(payload), text=payload["text"], headers={})
+
+
+async def handle_analyze_job(payload):
+    return await run_analyze(pages=job_pages(payload), text=payload["text"], career_name=payload["career_name"],
+                             headers={})
+
+
+def job_token_estimate(chains):
+    async def estimate(payload):
+        await load_encoding()
+        return (get_number_of_tokens(payload["text"]) + JOB_PROMPT_OVERHEAD_TOKENS) * chains
+    return estimate
+
+
+job_queue.register("generate", handle_generate_job, job_token_estimate(chains=3))
+job_queue.register("analyze", handle_analyze_job, job_token_estimate(chains=2))
+
+
+def submit_job(kind, authorization, payload):
+    try:
+        job_id = job_queue.submit(kind, authorization, payload)
+    except QueueFull:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "30"},
+                            content={"data": "Error", "status": status.HTTP_503_SERVICE_UNAVAILABLE,
+                                     "message": "Too many jobs are queued, try again shortly"})
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, headers={"Location": f"/jobs/{job_id}/"},
+                        content={"data": {"job_id": job_id, "status": "queued"}, "status": status.HTTP_202_ACCEPTED})
+
+
+@app.post("/jobs/generate/", status_code=status.HTTP_202_ACCEPTED)
+async def create_generate_job(resume: Annotated[UploadFile, File()],
+                              authorization: Annotated[Union[str, None], Header(name="Authorization")],
+                              response: Response):
+    if await is_authorized(authorization):
+        pages, text = await check_doc_type(resume)
+        return submit_job("generate", authorization, {"pages": [page.page_content for page in pages], "text": text})
+    response.status_code = status.HTTP_401_UNAUTHORIZED
+    return {"data": "Error", "status": status.HTTP_401_UNAUTHORIZED, "message": "Not Authorized"}
+
+
+@app.post("/jobs/analyze/", status_code=status.HTTP_202_ACCEPTED)
+async def create_analyze_job(resume: Annotated[UploadFile, File()], career_name: Annotated[str, Form()],
+                             authorization: Annotated[Union[str, None], Header(name="Authorization")],
+                             response: Response):
+    if await is_authorized(authorization):
+        pages, text = await check_doc_type(resume)
+        return submit_job("analyze", authorization, {"pages": [page.page_content for page in pages], "text": text,
+                                                     "career_name": career_name})
     response.status_code = status.HTTP_401_UNAUTHORIZED
     return {"data": "Error", "status": status.HTTP_401_UNAUTHORIZED, "message": "Not Authorized"}
+
+
+@app.get("/jobs/{job_id}/")
+async def get_job(job_id: str, authorization: Annotated[Union[str, None], Header(name="Authorization")],
+                  response: Response, wait: Annotated[float, Query(ge=0, le=JOB_MAX_WAIT)] = 0):
+    if await is_authorized(authorization):
+        if job_queue.get(job_id, authorization) is not None and wait:
+            await job_queue.wait(job_id, wait)
+        job = job_queue.get(job_id, authorization)
+        if job is None:
+            response.status_code = status.HTTP_404_NOT_FOUND
+            return {"data": "Error", "status": status.HTTP_404_NOT_FOUND, "message": "Job not found"}
+        return {"data": job, "status": status.HTTP_200_OK}
+    response.status_code = status.HTTP_401_UNAUTHORIZED
+    return {"data": "Error", "status": status.HTTP_401_UNAUTHORIZED, "message": "Not Authorized"}
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/ready")
+async def ready(response: Response):
+    if warm_up_task is None or not warm_up_task.done():
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"data": "Error", "status": status.HTTP_503_SERVICE_UNAVAILABLE, "message": "Warming up"}
+    if warm_up_task.cancelled() or warm_up_task.exception() is not None:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"data": "Error", "status": status.HTTP_503_SERVICE_UNAVAILABLE, "message": "Warm-up failed"}
+    return {"data": "Ready", "status": status.HTTP_200_OK}
@@ -0,0 +1,129 @@
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+BYTE_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000)
+
+# Stage timings of the current request, collected for the Server-Timing header when the client asks for it.
+request_timings = ContextVar("request_timings", default=None)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"'.replace("\n", " ") for name, value in labels)
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{format_labels(labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._values[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {cumulative}")
+        return lines
+
+
+class CallbackCounter:
+    # Exposes counters that are kept elsewhere, such as cache hits, read when /metrics is scraped.
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self.callback():
+            lines.append(f"{self.name}{format_labels(tuple(sorted(labels.items())))} {value}")
+        return lines
+
+
+stage_seconds = Histogram("resume_stage_seconds", "Latency of each request processing stage")
+llm_tokens = Counter("resume_llm_tokens_total", "Prompt and completion tokens sent to and received from each chain")
+llm_prompt_tokens = Histogram("resume_llm_prompt_tokens", "Prompt tokens per chain call", TOKEN_BUCKETS)
+document_bytes = Histogram("resume_document_bytes", "Size of uploaded documents", BYTE_BUCKETS)
+document_pages = Histogram("resume_document_pages", "Pages of uploaded PDF documents", SIZE_BUCKETS)
+document_chunks = Histogram("resume_document_chunks", "Chunks produced from uploaded documents", SIZE_BUCKETS)
+registry = [stage_seconds, llm_tokens, llm_prompt_tokens, document_bytes, document_pages, document_chunks]
+
+
+def register(metric):
+    registry.append(metric)
+    return metric
+
+
+def record_stage(name, seconds):
+    stage_seconds.observe(seconds, stage=name)
+    timings = request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def record_tokens(chain, kind, tokens):
+    llm_tokens.inc(tokens, chain=chain, kind=kind)
+    if kind == "prompt":
+        llm_prompt_tokens.observe(tokens, chain=chain)
+
+
+def record_document(size, pages, chunks):
+    document_bytes.observe(size)
+    if pages is not None:
+        document_pages.observe(pages)
+    document_chunks.observe(chunks)
+
+
+def render():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(timings):
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings)
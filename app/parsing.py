@@ -0,0 +1,234 @@
+import asyncio
+import io
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from xml.etree import ElementTree
+
+from decouple import config
+from fastapi import status
+
+from .metrics import stage, record_document
+
+
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PDF_CONTENT_TYPE = "application/pdf"
+SUPPORTED_CONTENT_TYPES = (DOCX_CONTENT_TYPE, PDF_CONTENT_TYPE)
+
+PARSER_EXECUTOR = config("PARSER_EXECUTOR", default="process")
+PARSER_WORKERS = config("PARSER_WORKERS", default=2, cast=int)
+PARSER_MAX_QUEUE = config("PARSER_MAX_QUEUE", default=32, cast=int)
+MAX_DOCUMENT_BYTES = config("MAX_DOCUMENT_BYTES", default=5 * 1024 * 1024, cast=int)
+MAX_DOCUMENT_PAGES = config("MAX_DOCUMENT_PAGES", default=20, cast=int)
+
+
+class DocumentError(Exception):
+    def __init__(self, message, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY):
+        super().__init__(message, status_code)
+        self.message = message
+        self.status_code = status_code
+
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MARKUP_COMPATIBILITY_NAMESPACE = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+PARAGRAPH = WORD_NAMESPACE + "p"
+RUN = WORD_NAMESPACE + "r"
+TEXT = WORD_NAMESPACE + "t"
+BREAK = WORD_NAMESPACE + "br"
+FALLBACK = MARKUP_COMPATIBILITY_NAMESPACE + "Fallback"
+# Run children rendered the same way python-docx renders them.
+RUN_CHARACTERS = {WORD_NAMESPACE + "tab": "\t", WORD_NAMESPACE + "ptab": "\t", WORD_NAMESPACE + "cr": "\n",
+                  WORD_NAMESPACE + "noBreakHyphen": "-"}
+HEADER_PATTERN = re.compile(r"word/header\d*\.xml")
+FOOTER_PATTERN = re.compile(r"word/footer\d*\.xml")
+DOCX_CHUNK_SIZE = 3000
+DOCX_CHUNK_OVERLAP = 20
+
+
+def iter_part_paragraphs(part):
+    # Streams the paragraphs of one WordprocessingML part, including those in tables and text boxes. Text boxes
+    # are stored twice, as DrawingML and as a VML fallback, so mc:Fallback content is skipped.
+    paragraphs = []
+    parents = []
+    fallback_depth = 0
+    for event, element in ElementTree.iterparse(part, events=("start", "end")):
+        if event == "start":
+            if element.tag == FALLBACK:
+                fallback_depth += 1
+            elif element.tag == PARAGRAPH and not fallback_depth:
+                paragraphs.append([])
+            parents.append(element.tag)
+            continue
+
+        parents.pop()
+        if element.tag == FALLBACK:
+            fallback_depth -= 1
+        elif fallback_depth or not paragraphs:
+            pass
+        elif element.tag == PARAGRAPH:
+            yield "".join(paragraphs.pop())
+            element.clear()
+        elif parents and parents[-1] == RUN:
+            if element.tag == TEXT:
+                paragraphs[-1].append(element.text or "")
+            elif element.tag == BREAK and element.get(WORD_NAMESPACE + "type", "textWrapping") == "textWrapping":
+                paragraphs[-1].append("\n")
+            elif element.tag in RUN_CHARACTERS:
+                paragraphs[-1].append(RUN_CHARACTERS[element.tag])
+
+
+def iter_docx_paragraphs(data):
+    # Headers first, since resume templates often keep the name and contact details there, then the body, then
+    # the footers. Paragraphs repeated across the first-page, even and default headers are kept once.
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        names = archive.namelist()
+        headers = sorted(name for name in names if HEADER_PATTERN.fullmatch(name))
+        footers = sorted(name for name in names if FOOTER_PATTERN.fullmatch(name))
+        for parts, repeated in ((headers, True), (["word/document.xml"], False), (footers, True)):
+            seen = set()
+            for name in parts:
+                with archive.open(name) as part:
+                    for paragraph in iter_part_paragraphs(part):
+                        if repeated:
+                            if not paragraph.strip() or paragraph in seen:
+                                continue
+                            seen.add(paragraph)
+                        yield paragraph
+
+
+def split_incrementally(paragraphs, text_splitter, chunk_size=DOCX_CHUNK_SIZE):
+    # Feeds the splitter a few chunks of text at a time. The last chunk of each round may still grow, so it is
+    # carried into the next round and no chunk is cut short at a round boundary.
+    buffer = []
+    buffered = 0
+    first = True
+    for paragraph in paragraphs:
+        if not first:
+            buffer.append(" ")
+        buffer.append(paragraph)
+        buffered += len(paragraph) + 1
+        first = False
+        if buffered >= 4 * chunk_size:
+            chunks = text_splitter.split_text("".join(buffer))
+            yield from chunks[:-1]
+            buffer = [chunks[-1]] if chunks else []
+            buffered = sum(len(text) for text in buffer)
+    yield from text_splitter.split_text("".join(buffer))
+
+
+def parse_docx(data):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=DOCX_CHUNK_SIZE,
+        chunk_overlap=DOCX_CHUNK_OVERLAP,
+        length_function=len,
+        is_separator_regex=False
+    )
+    paragraphs = []
+
+    def collect():
+        for paragraph in iter_docx_paragraphs(data):
+            paragraphs.append(paragraph)
+            yield paragraph
+
+    pages = []
+    for page in split_incrementally(collect(), text_splitter):
+        pages.append(page)
+        # Stops reading as soon as the limit is crossed instead of extracting the whole document first.
+        if len(pages) > MAX_DOCUMENT_PAGES:
+            raise DocumentError(f"Document exceeds the limit of {MAX_DOCUMENT_PAGES} pages",
+                                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    texts = " ".join(paragraphs)
+    # DOCX files have no fixed pages, only the chunks produced by the splitter.
+    return pages, texts, None
+
+
+def parse_pdf(data):
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    if len(reader.pages) > MAX_DOCUMENT_PAGES:
+        raise DocumentError(f"Document exceeds the limit of {MAX_DOCUMENT_PAGES} pages",
+                            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    pages = [page.extract_text() for page in reader.pages]
+    texts = " ".join(pages)
+    return pages, texts, len(pages)
+
+
+def parse_document(content_type, data):
+    # Runs inside the worker pool, so it only takes and returns picklable values.
+    if content_type == DOCX_CONTENT_TYPE:
+        return parse_docx(data)
+    return parse_pdf(data)
+
+
+_executor = None
+_pending = 0
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        if PARSER_EXECUTOR == "thread":
+            _executor = ThreadPoolExecutor(max_workers=PARSER_WORKERS, thread_name_prefix="parser")
+        else:
+            _executor = ProcessPoolExecutor(max_workers=PARSER_WORKERS)
+    return _executor
+
+
+def preload_parsers():
+    import pypdf
+    import langchain_text_splitters
+
+
+async def warm_up_executor():
+    # Starts the workers and imports the parsers in them, so the first upload does not pay for either.
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    await asyncio.gather(*(loop.run_in_executor(executor, preload_parsers) for _ in range(PARSER_WORKERS)))
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def check_doc_type(document):
+    global _pending
+    if document.content_type not in SUPPORTED_CONTENT_TYPES:
+        raise DocumentError(f"Unsupported document type {document.content_type}. Upload a PDF or DOCX file",
+                            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+    if document.size is not None and document.size > MAX_DOCUMENT_BYTES:
+        raise DocumentError(f"Document exceeds the limit of {MAX_DOCUMENT_BYTES} bytes",
+                            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    if _pending >= PARSER_MAX_QUEUE:
+        raise DocumentError("Too many documents are being processed, try again shortly",
+                            status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    _pending += 1
+    try:
+        data = await document.read(MAX_DOCUMENT_BYTES + 1)
+        if len(data) > MAX_DOCUMENT_BYTES:
+            raise DocumentError(f"Document exceeds the limit of {MAX_DOCUMENT_BYTES} bytes",
+                                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        loop = asyncio.get_running_loop()
+        try:
+            with stage("parse"):
+                page_texts, texts, page_count = await loop.run_in_executor(get_executor(), parse_document,
+                                                                           document.content_type, data)
+        except DocumentError:
+            raise
+        except Exception:
+            raise DocumentError("The document could not be read")
+    finally:
+        _pending -= 1
+
+    record_document(size=len(data), pages=page_count, chunks=len(page_texts))
+
+    from langchain_core.documents import Document
+
+    pages = [Document(page_content=page_text) for page_text in page_texts]
+    return pages, texts
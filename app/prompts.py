@@ -1,43 +1,69 @@
 import asyncio
+import importlib
+import logging
+import time
+from collections import Counter
+from functools import lru_cache
 
-from langchain_core.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI, OpenAI
-from langchain.output_parsers import PydanticOutputParser
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
+import httpx
 from decouple import config
-import tiktoken
 
-from app.schemas import First, Second, Third, FirstATS, SecondATS
-
-
-def get_number_of_tokens(documents):
-    encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
-    encoding.encode(documents)
-    number_tokens = len(encoding.encode(documents))
-    return number_tokens
-
-
-async def extract_resume_schema(pages):
-    db = Chroma.from_documents(pages, OpenAIEmbeddings(
-        openai_api_key=config("OPENAI_API_KEY")))
-
-    first_documents = db.similarity_search(
-        "Extract the personal_information and education in this resume. Education is different from certificate ",
-        k=4)
-    second_documents = db.similarity_search("Extract the  "
-                                                      "work experience, skills and certifications in "
-                                                      "this resume", k=10)
-
-    first_output_parser = PydanticOutputParser(pydantic_object=First)
-    second_output_parser = PydanticOutputParser(pydantic_object=Second)
-    third_output_parser = PydanticOutputParser(pydantic_object=Third)
-
-    first_format_instructions = first_output_parser.get_format_instructions()
-    second_format_instructions = second_output_parser.get_format_instructions()
-    third_format_instructions = third_output_parser.get_format_instructions()
-
-    first_template = """
+from app.careers import CareerProfileStore, match_career_profile, CAREER_PROFILE_CACHE_PATH
+from app.contacts import detect_contacts, is_ambiguous, resolve_contacts
+from app.deadlines import ChainError, run_with_deadline, OK, HEDGED, FALLBACK
+from app.metrics import stage, record_tokens, register, CallbackCounter
+from app.retrieval import EmbeddingCache, QueryEmbeddings, VectorIndex, EMBEDDING_CACHE_PATH
+from app.schemas import First, Second, Third, FirstATS, SecondATS, CareerProfile, ExperienceATS
+
+# Bump whenever a template, schema or model below changes so cached results are not reused.
+PROMPT_VERSION = "3"
+EXTRACT_MODEL = "gpt-3.5-turbo-0125"
+ANALYZE_MODEL = "gpt-4-0125-preview"
+EMBEDDING_MODEL = "text-embedding-ada-002"
+# Faster model the analysis chains fall back to when their deadline is at risk; unset disables the fallback.
+ANALYZE_FALLBACK_MODEL = config("ANALYZE_FALLBACK_MODEL", default="")
+
+OPENAI_MAX_CONNECTIONS = config("OPENAI_MAX_CONNECTIONS", default=50, cast=int)
+OPENAI_TIMEOUT = config("OPENAI_TIMEOUT", default=120.0, cast=float)
+
+# Ask the LLM about contact details only when the local detector finds them ambiguous.
+CONTACT_LLM_FALLBACK = config("CONTACT_LLM_FALLBACK", default=False, cast=bool)
+# Score keywords locally against a cached per-career profile instead of sending the full SecondATS prompt.
+CAREER_PROFILES = config("CAREER_PROFILES", default=True, cast=bool)
+
+# Documents whose whole text fits this many tokens are sent to the prompts as-is, without embeddings or retrieval.
+CONTEXT_TOKEN_BUDGET = config("CONTEXT_TOKEN_BUDGET", default=6000, cast=int)
+DIRECT_CONTEXT = "direct"
+RETRIEVAL_CONTEXT = "retrieval"
+
+PERSONAL_INFORMATION_SECTION = "personal_information"
+WORK_EXPERIENCE_SECTION = "work_experience"
+SKILLS_SECTION = "skills"
+KEYWORDS_SECTION = "keywords"
+EXTRACT_SECTIONS = (PERSONAL_INFORMATION_SECTION, WORK_EXPERIENCE_SECTION, SKILLS_SECTION)
+
+EXTRACT_FIRST_QUERY = \
+    "Extract the personal_information and education in this resume. Education is different from certificate "
+EXTRACT_SECOND_QUERY = "Extract the  work experience, skills and certifications in this resume"
+ANALYZE_FIRST_QUERY = \
+    "Extract the personal_information and education in this resume. Education is different from certificate"
+ANALYZE_SECOND_QUERY = "Extract the work experience in this resume."
+
+logger = logging.getLogger(__name__)
+context_mode_counts = Counter()
+register(CallbackCounter("resume_context_mode_total", "Requests by context mode, direct or retrieval",
+                         lambda: [({"mode": mode}, count) for mode, count in context_mode_counts.items()]))
+career_profile_store = CareerProfileStore(version=(PROMPT_VERSION, ANALYZE_MODEL),
+                                          path=CAREER_PROFILE_CACHE_PATH or None)
+embedding_cache = EmbeddingCache(path=EMBEDDING_CACHE_PATH or None)
+register(CallbackCounter("resume_embedding_cache_total", "Document chunks looked up in the embedding cache",
+                         lambda: [({"result": "hit"}, embedding_cache.hits),
+                                  ({"result": "miss"}, embedding_cache.misses)]))
+query_embeddings = QueryEmbeddings(
+    [EXTRACT_FIRST_QUERY, EXTRACT_SECOND_QUERY, ANALYZE_FIRST_QUERY, ANALYZE_SECOND_QUERY])
+
+
+EXTRACT_FIRST_TEMPLATE = """
         Extract the personal_information and education in this resume. Education is different from certificate. 
 
         The resume is: {first_documents}  
@@ -45,24 +71,16 @@ async def extract_resume_schema(pages):
         Format instructions: {format_instructions}
 
         """
-    first_prompt = PromptTemplate(
-        template=first_template,
-        input_variables=["first_documents"],
-        partial_variables={"format_instructions": first_format_instructions})
 
-    second_template = """Extract the work_experience, and certifications in this resume. 
+EXTRACT_SECOND_TEMPLATE = """Extract the work_experience, and certifications in this resume. 
     
             The resume is: {second_documents}  
 
             Format instructions: {format_instructions}
 
             """
-    second_prompt = PromptTemplate(
-        template=second_template,
-        input_variables=["second_documents"],
-        partial_variables={"format_instructions": second_format_instructions})
 
-    third_template = """Extract the skills in this resume. When there are more than one skill on a line, break a line of
+EXTRACT_THIRD_TEMPLATE = """Extract the skills in this resume. When there are more than one skill on a line, break a line of
      skills into each skill. The response for the 
         skills, should be one skill per line, proficiency_level, and years_of_experience. The years_of_experience of 
         the skill should be based on the number of years the skill was mentioned in the work_experience responsibility.
@@ -104,42 +122,8 @@ async def extract_resume_schema(pages):
                 Format instructions: {format_instructions}
 
                 """
-    third_prompt = PromptTemplate(
-        template=third_template,
-        input_variables=["third_documents"],
-        partial_variables={"format_instructions": third_format_instructions})
-
-    llm = ChatOpenAI(openai_api_key=config("OPENAI_API_KEY"), temperature=0.0, model_name='gpt-3.5-turbo-0125')
-
-    first = first_prompt | llm | first_output_parser
-    second = second_prompt | llm | second_output_parser
-    third = third_prompt | llm | third_output_parser
-
-    tasks = [first.ainvoke({"first_documents": first_documents}),
-             second.ainvoke({"second_documents": second_documents}),
-             third.ainvoke({"third_documents": second_documents})]
-
-    list_of_tasks = await asyncio.gather(*tasks)
-
-    db.delete_collection()
-    return list_of_tasks
-
-
-async def analyze_resume_schema(pages, career_name):
-    db = Chroma.from_documents(pages, OpenAIEmbeddings(openai_api_key=config("OPENAI_API_KEY")))
-
-    first_documents = db.similarity_search(
-        "Extract the personal_information and education in this resume. Education is different from certificate",
-        k=4)
-    second_documents = db.similarity_search("Extract the work experience in this resume.", k=10)
-
-    first_output_parser = PydanticOutputParser(pydantic_object=FirstATS)
-    second_output_parser = PydanticOutputParser(pydantic_object=SecondATS)
-
-    first_format_instructions = first_output_parser.get_format_instructions()
-    second_format_instructions = second_output_parser.get_format_instructions()
 
-    first_template = """
+ANALYZE_FIRST_TEMPLATE = """
                 Extract the email_address. Check if the email_address don't exist, return No. If email_address exist, return Yes.
                 Extract the phone_number. Check if the phone_number don't exist, return No. If phone_number exist, return Yes.
                 Extract the linkedin. Check  if the linkedin don't exist, return No. If linkedin exist, return Yes.
@@ -149,12 +133,8 @@ async def analyze_resume_schema(pages, career_name):
         Format instructions: {format_instructions}
 
         """
-    first_prompt = PromptTemplate(
-        template=first_template,
-        input_variables=["first_documents"],
-        partial_variables={"format_instructions": first_format_instructions})
 
-    second_template = """
+ANALYZE_SECOND_TEMPLATE = """
                 Compare this {career_name} with this resume, Analyze and measure this resume based on the following parameters:
                 total_work_experience_count, keyword_count, job_title_keyword_count, 
                 keyword_stuffing_count, general_keyword_count, category_keyword_count, ats_keywords_to_add, and, 
@@ -226,24 +206,324 @@ async def analyze_resume_schema(pages, career_name):
             Format instructions: {format_instructions}
 
             """
-    second_prompt = PromptTemplate(
-        template=second_template,
-        input_variables=["second_documents", "career_name"],
-        partial_variables={"format_instructions": second_format_instructions})
 
-    llm = ChatOpenAI(openai_api_key=config("OPENAI_API_KEY"), temperature=0.0, model_name='gpt-3.5-turbo-0125')
-    llm_second_prompt = ChatOpenAI(openai_api_key=config("OPENAI_API_KEY"), temperature=0.0, model_name='gpt-4-0125-preview')
 
-    first = first_prompt | llm | first_output_parser
-    second = second_prompt | llm_second_prompt | second_output_parser
+CAREER_PROFILE_TEMPLATE = """
+                Build the ATS keyword profile of this career: {career_name}.
 
-    tasks = [
-        first.ainvoke({"first_documents": first_documents}),
-        second.ainvoke({"second_documents": second_documents, "career_name": career_name}),
-    ]
+                job_titles: the common job titles for {career_name}, including {career_name} itself. Maximum of 10.
+                action_verbs: the strong action verbs used in resume accomplishment statements for {career_name}, 
+                written in the past tense. For example: Led, Built, Troubleshot, Debugged. Maximum of 40.
+                professional_terms: the professional terms used in {career_name}. For example: team, developers, 
+                chatbot, application, software, methodologies. Maximum of 60.
+                tools: the name of the tools, frameworks, libraries, platforms and programming languages that are 
+                required in {career_name}. For example: Python, Transformers, ChatGPT API. Maximum of 60.
 
-    list_of_tasks = await asyncio.gather(*tasks)
+                Use the shortest common form of every keyword, for example Python and not Python programming.
+
+            Format instructions: {format_instructions}
+
+            """
+
+ANALYZE_EXPERIENCE_TEMPLATE = """
+                The total_work_experience_count is the total number of work_experience in the resume.
+                The job_title_count is the number of work_experience in the resume whose job title is one of: 
+                {job_titles}.
+
+            The resume is: {second_documents}  
+
+            Format instructions: {format_instructions}
+
+            """
 
-    db.delete_collection()
-    return list_of_tasks
 
+@lru_cache(maxsize=None)
+def get_encoding():
+    import tiktoken
+
+    return tiktoken.encoding_for_model("gpt-3.5-turbo")
+
+
+def get_number_of_tokens(documents):
+    number_tokens = len(get_encoding().encode(documents))
+    return number_tokens
+
+
+async def load_encoding():
+    # The first load can download the encoding, so it runs in a thread rather than on the event loop.
+    if not get_encoding.cache_info().currsize:
+        await asyncio.to_thread(get_encoding)
+
+
+def get_context_mode(pages):
+    number_tokens = get_number_of_tokens(" ".join(page.page_content for page in pages))
+    context_mode = DIRECT_CONTEXT if number_tokens <= CONTEXT_TOKEN_BUDGET else RETRIEVAL_CONTEXT
+    context_mode_counts[context_mode] += 1
+    logger.info("Using %s context for %d pages (%d tokens)", context_mode, len(pages), number_tokens)
+    return context_mode
+
+
+def build_prompt(template, input_variables, output_parser):
+    from langchain_core.prompts import PromptTemplate
+
+    return PromptTemplate(
+        template=template,
+        input_variables=input_variables,
+        partial_variables={"format_instructions": output_parser.get_format_instructions()})
+
+
+def count_tokens(chain, kind):
+    # Passes the prompt or completion through unchanged, recording its token count for the chain.
+    from langchain_core.runnables import RunnableLambda
+
+    def record(value):
+        text = value.content if kind == "completion" else value.to_string()
+        record_tokens(chain, kind, get_number_of_tokens(text))
+        return value
+
+    async def arecord(value):
+        return record(value)
+
+    return RunnableLambda(record, afunc=arecord)
+
+
+def build_chain(chain, prompt, llm, output_parser):
+    return prompt | count_tokens(chain, "prompt") | llm | count_tokens(chain, "completion") | output_parser
+
+
+class Pipelines:
+    # Clients, parsers, prompts and chains shared by every request. Only the resume and career_name vary per call.
+    def __init__(self):
+        from langchain_core.output_parsers import PydanticOutputParser
+        from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+        openai_api_key = config("OPENAI_API_KEY")
+        self.http_async_client = httpx.AsyncClient(
+            timeout=OPENAI_TIMEOUT,
+            limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS,
+                                max_keepalive_connections=OPENAI_MAX_CONNECTIONS))
+
+        self.embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key, model=EMBEDDING_MODEL,
+                                           http_async_client=self.http_async_client)
+        self.extract_llm = ChatOpenAI(openai_api_key=openai_api_key, temperature=0.0, model_name=EXTRACT_MODEL,
+                                      http_async_client=self.http_async_client)
+        self.analyze_llm = ChatOpenAI(openai_api_key=openai_api_key, temperature=0.0, model_name=ANALYZE_MODEL,
+                                      http_async_client=self.http_async_client)
+
+        self.extract_first_parser = PydanticOutputParser(pydantic_object=First)
+        self.extract_second_parser = PydanticOutputParser(pydantic_object=Second)
+        self.extract_third_parser = PydanticOutputParser(pydantic_object=Third)
+        self.analyze_first_parser = PydanticOutputParser(pydantic_object=FirstATS)
+        self.analyze_second_parser = PydanticOutputParser(pydantic_object=SecondATS)
+        self.career_profile_parser = PydanticOutputParser(pydantic_object=CareerProfile)
+        self.analyze_experience_parser = PydanticOutputParser(pydantic_object=ExperienceATS)
+
+        self.extract_first_prompt = build_prompt(EXTRACT_FIRST_TEMPLATE, ["first_documents"],
+                                                 self.extract_first_parser)
+        self.extract_second_prompt = build_prompt(EXTRACT_SECOND_TEMPLATE, ["second_documents"],
+                                                  self.extract_second_parser)
+        self.extract_third_prompt = build_prompt(EXTRACT_THIRD_TEMPLATE, ["third_documents"],
+                                                 self.extract_third_parser)
+        self.analyze_first_prompt = build_prompt(ANALYZE_FIRST_TEMPLATE, ["first_documents"],
+                                                 self.analyze_first_parser)
+        self.analyze_second_prompt = build_prompt(ANALYZE_SECOND_TEMPLATE, ["second_documents", "career_name"],
+                                                  self.analyze_second_parser)
+        self.career_profile_prompt = build_prompt(CAREER_PROFILE_TEMPLATE, ["career_name"],
+                                                  self.career_profile_parser)
+        self.analyze_experience_prompt = build_prompt(ANALYZE_EXPERIENCE_TEMPLATE, ["second_documents", "job_titles"],
+                                                      self.analyze_experience_parser)
+
+        self.extract_first = build_chain("extract_first", self.extract_first_prompt, self.extract_llm,
+                                         self.extract_first_parser)
+        self.extract_second = build_chain("extract_second", self.extract_second_prompt, self.extract_llm,
+                                          self.extract_second_parser)
+        self.extract_third = build_chain("extract_third", self.extract_third_prompt, self.extract_llm,
+                                         self.extract_third_parser)
+        self.analyze_first = build_chain("analyze_first", self.analyze_first_prompt, self.extract_llm,
+                                         self.analyze_first_parser)
+        self.analyze_second = build_chain("analyze_second", self.analyze_second_prompt, self.analyze_llm,
+                                          self.analyze_second_parser)
+        self.career_profile = build_chain("career_profile", self.career_profile_prompt, self.analyze_llm,
+                                          self.career_profile_parser)
+        self.analyze_experience = build_chain("analyze_experience", self.analyze_experience_prompt,
+                                              self.extract_llm, self.analyze_experience_parser)
+
+        self.fallbacks = {}
+        if ANALYZE_FALLBACK_MODEL:
+            fallback_llm = ChatOpenAI(openai_api_key=openai_api_key, temperature=0.0,
+                                      model_name=ANALYZE_FALLBACK_MODEL, http_async_client=self.http_async_client)
+            self.fallbacks["analyze_second"] = build_chain("analyze_second", self.analyze_second_prompt, fallback_llm,
+                                                           self.analyze_second_parser)
+            self.fallbacks["career_profile"] = build_chain("career_profile", self.career_profile_prompt, fallback_llm,
+                                                           self.career_profile_parser)
+
+    async def invoke(self, chain, inputs):
+        # Returns (result, outcome); raises ChainError when the chain misses its deadline or every attempt fails.
+        fallback = self.fallbacks.get(chain)
+        with stage(f"llm_{chain}"):
+            return await run_with_deadline(chain, lambda: getattr(self, chain).ainvoke(inputs),
+                                           None if fallback is None else lambda: fallback.ainvoke(inputs))
+
+    async def aclose(self):
+        await self.http_async_client.aclose()
+
+
+_pipelines = None
+
+
+def get_pipelines():
+    global _pipelines
+    if _pipelines is None:
+        _pipelines = Pipelines()
+    return _pipelines
+
+
+async def init_pipelines():
+    # The OpenAI clients and the tokenizer load in a thread so the event loop keeps answering health checks.
+    await asyncio.to_thread(importlib.import_module, "langchain_openai")
+    pipelines = get_pipelines()
+    await load_encoding()
+    await query_embeddings.get(pipelines.embeddings)
+    return pipelines
+
+
+async def close_pipelines():
+    global _pipelines
+    career_profile_store.close()
+    embedding_cache.close()
+    if _pipelines is not None:
+        await _pipelines.aclose()
+        _pipelines = None
+
+
+async def retrieve_documents(pages, queries):
+    embeddings = get_pipelines().embeddings
+    with stage("embedding"):
+        query_vectors, index = await asyncio.gather(query_embeddings.get(embeddings),
+                                                    VectorIndex.from_documents(pages, embeddings, embedding_cache))
+    with stage("similarity_search"):
+        return [index.similarity_search_by_vector(query_vectors[query], k=k) for query, k in queries]
+
+
+async def get_extract_tasks(pages):
+    # Returns the context mode and one (section, coroutine) pair per extraction chain.
+    pipelines = get_pipelines()
+    await load_encoding()
+    context_mode = get_context_mode(pages)
+    if context_mode == DIRECT_CONTEXT:
+        first_documents = second_documents = pages
+    else:
+        first_documents, second_documents = await retrieve_documents(
+            pages, [(EXTRACT_FIRST_QUERY, 4), (EXTRACT_SECOND_QUERY, 10)])
+
+    tasks = [(PERSONAL_INFORMATION_SECTION, pipelines.invoke("extract_first", {"first_documents": first_documents})),
+             (WORK_EXPERIENCE_SECTION, pipelines.invoke("extract_second", {"second_documents": second_documents})),
+             (SKILLS_SECTION, pipelines.invoke("extract_third", {"third_documents": second_documents}))]
+    return context_mode, tasks
+
+
+async def settle(task):
+    # Returns (result, status) so that one chain missing its deadline leaves the other results usable. A hedged
+    # result comes from the same model, so it is ok; fallback results are reported like missing sections.
+    try:
+        result, outcome = await task
+    except ChainError as error:
+        return None, error.status
+    return result, OK if outcome == HEDGED else outcome
+
+
+async def extract_resume_schema(pages):
+    # Returns the sections, None for those whose chain failed, the status of each failed section and the context mode.
+    context_mode, tasks = await get_extract_tasks(pages)
+    settled = await asyncio.gather(*[settle(task) for _, task in tasks])
+    partial = {section: status for (section, _), (_, status) in zip(tasks, settled) if status != OK}
+    return [result for result, _ in settled], partial, context_mode
+
+
+async def stream_resume_schema(pages):
+    # Returns the context mode and an async iterator of (section, result, status, seconds) in completion order.
+    context_mode, tasks = await get_extract_tasks(pages)
+    started = time.perf_counter()
+
+    async def run(section, task):
+        result, status = await settle(task)
+        return section, result, status, time.perf_counter() - started
+
+    async def sections():
+        futures = [asyncio.ensure_future(run(section, task)) for section, task in tasks]
+        try:
+            for next_done in asyncio.as_completed(futures):
+                yield await next_done
+        finally:
+            for future in futures:
+                future.cancel()
+
+    return context_mode, sections()
+
+
+class AnalysisContext:
+    # The career-independent part of an analysis: retrieved resume text, its tokens and contact details.
+    def __init__(self, second_documents, tokens, contacts, context_mode):
+        self.second_documents = second_documents
+        self.tokens = tokens
+        self.contacts = contacts
+        self.context_mode = context_mode
+
+
+async def prepare_analysis(pages, text_stats):
+    pipelines = get_pipelines()
+    contacts = detect_contacts(text_stats.text)
+    contact_fallback = CONTACT_LLM_FALLBACK and is_ambiguous(contacts)
+
+    await load_encoding()
+    context_mode = get_context_mode(pages)
+    if context_mode == DIRECT_CONTEXT:
+        first_documents = second_documents = pages
+    elif contact_fallback:
+        first_documents, second_documents = await retrieve_documents(
+            pages, [(ANALYZE_FIRST_QUERY, 4), (ANALYZE_SECOND_QUERY, 10)])
+    else:
+        second_documents, = await retrieve_documents(pages, [(ANALYZE_SECOND_QUERY, 10)])
+
+    async def resolve():
+        fallback = None
+        if contact_fallback:
+            # Without an answer in time the ambiguous fields take their defaults, as with the fallback off.
+            fallback, _ = await settle(pipelines.invoke("analyze_first", {"first_documents": first_documents}))
+        return resolve_contacts(contacts, fallback)
+
+    # The contact fallback runs alongside the career chains rather than in front of them.
+    return AnalysisContext(second_documents, text_stats.tokens, asyncio.ensure_future(resolve()), context_mode)
+
+
+async def generate_career_profile(career_name):
+    # Returns (profile, outcome).
+    return await get_pipelines().invoke("career_profile", {"career_name": career_name})
+
+
+async def get_career_profile(career_name):
+    return await career_profile_store.get(career_name, generate_career_profile)
+
+
+async def analyze_career(context, career_name):
+    # Returns (keyword result, outcome), with outcome fallback when any part came from the fallback model.
+    pipelines = get_pipelines()
+    if not CAREER_PROFILES:
+        return await pipelines.invoke("analyze_second", {"second_documents": context.second_documents,
+                                                         "career_name": career_name})
+
+    profile, profile_outcome = await get_career_profile(career_name)
+    experience, experience_outcome = await pipelines.invoke(
+        "analyze_experience", {"second_documents": context.second_documents,
+                               "job_titles": ", ".join(profile.job_titles)})
+    outcome = FALLBACK if FALLBACK in (profile_outcome, experience_outcome) else OK
+    return match_career_profile(profile, context.tokens, experience), outcome
+
+
+async def analyze_resume_schema(pages, career_name, text_stats):
+    # Like extract_resume_schema, the keyword result is None when its chains failed, with the status in partial.
+    # A keyword result from the fallback model is kept and reported in partial as fallback.
+    context = await prepare_analysis(pages, text_stats)
+    (second, status), first = await asyncio.gather(settle(analyze_career(context, career_name)), context.contacts)
+    partial = {KEYWORDS_SECTION: status} if status != OK else {}
+    return [first, second], partial, context.context_mode
@@ -0,0 +1,138 @@
+import asyncio
+import sqlite3
+import time
+
+import numpy as np
+from decouple import config
+
+from .cache import TTLCache, make_key
+
+EMBEDDING_CACHE_SIZE = config("EMBEDDING_CACHE_SIZE", default=4096, cast=int)
+EMBEDDING_CACHE_PATH = config("EMBEDDING_CACHE_PATH", default="")
+EMBEDDING_CACHE_DISK_SIZE = config("EMBEDDING_CACHE_DISK_SIZE", default=100000, cast=int)
+# SQLite limits the number of parameters in one statement.
+SQLITE_BATCH_SIZE = 500
+
+
+class EmbeddingStore:
+    # Chunk vectors as float32 blobs keyed by a hash of the chunk text and the embedding model, least recently used
+    # rows evicted past maxsize.
+    def __init__(self, path, maxsize=EMBEDDING_CACHE_DISK_SIZE):
+        self.maxsize = maxsize
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, accessed_at REAL NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed_at ON embeddings (accessed_at)")
+
+    def get_many(self, keys):
+        now = time.time()
+        vectors = {}
+        for start in range(0, len(keys), SQLITE_BATCH_SIZE):
+            batch = keys[start:start + SQLITE_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._connection.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch).fetchall()
+            vectors.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+            self._connection.execute(
+                f"UPDATE embeddings SET accessed_at = ? WHERE key IN ({placeholders})", (now, *batch))
+        return vectors
+
+    def set_many(self, vectors):
+        now = time.time()
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)",
+            [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in vectors.items()])
+        self._connection.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY accessed_at DESC "
+            "LIMIT -1 OFFSET ?)", (self.maxsize,))
+
+    def close(self):
+        self._connection.close()
+
+
+class EmbeddingCache:
+    # Only chunks that were never embedded with this model go to the embeddings API, so a re-uploaded resume with
+    # one edited bullet re-embeds just the chunk that changed.
+    def __init__(self, maxsize=EMBEDDING_CACHE_SIZE, path=None):
+        self.memory = TTLCache(maxsize=maxsize, ttl=float("inf"))
+        self.store = EmbeddingStore(path) if path else None
+        self.hits = 0
+        self.misses = 0
+
+    async def embed_documents(self, texts, embeddings):
+        keys = [make_key("embedding", embeddings.model, text) for text in texts]
+        vectors = {}
+        for key in dict.fromkeys(keys):
+            vector = self.memory.get(key)
+            if vector is not None:
+                vectors[key] = vector
+        if self.store is not None and len(vectors) < len(set(keys)):
+            stored = self.store.get_many([key for key in dict.fromkeys(keys) if key not in vectors])
+            for key, vector in stored.items():
+                self.memory.set(key, vector)
+            vectors.update(stored)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        missed = sum(key in missing for key in keys)
+        self.hits += len(keys) - missed
+        self.misses += missed
+        if missing:
+            embedded = await embeddings.aembed_documents(list(missing.values()))
+            computed = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, embedded)}
+            for key, vector in computed.items():
+                self.memory.set(key, vector)
+            if self.store is not None:
+                self.store.set_many(computed)
+            vectors.update(computed)
+        return [vectors[key] for key in keys]
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+
+class VectorIndex:
+    # Cosine-similarity search over the chunks of a single document, held in memory for one request.
+    def __init__(self, documents, vectors):
+        self.documents = documents
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._matrix = matrix / np.where(norms == 0, 1, norms)
+
+    @classmethod
+    async def from_documents(cls, documents, embeddings, embedding_cache=None):
+        texts = [document.page_content for document in documents]
+        if embedding_cache is None:
+            vectors = await embeddings.aembed_documents(texts)
+        else:
+            vectors = await embedding_cache.embed_documents(texts, embeddings)
+        return cls(documents, vectors)
+
+    def similarity_search_by_vector(self, query_vector, k=4):
+        if not self.documents:
+            return []
+        scores = self._matrix @ query_vector
+        k = min(k, len(self.documents))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self.documents[index] for index in top]
+
+
+class QueryEmbeddings:
+    # The retrieval queries are fixed strings, so they are embedded once per process and reused by every request.
+    def __init__(self, queries):
+        self.queries = tuple(queries)
+        self._vectors = None
+        self._lock = asyncio.Lock()
+
+    async def get(self, embeddings):
+        if self._vectors is None:
+            async with self._lock:
+                if self._vectors is None:
+                    vectors = await embeddings.aembed_documents(list(self.queries))
+                    matrix = np.asarray(vectors, dtype=np.float32)
+                    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+                    self._vectors = dict(zip(self.queries, matrix))
+        return self._vectors
@@ -41,4 +41,13 @@ class SecondATS(BaseModel):
         'list of the general keywords to add to the resume to improve the general_keyword_score')
 
 
+class CareerProfile(BaseModel):
+    job_titles: List[str] = Field(description='Common job titles for the career, including the career name itself')
+    action_verbs: List[str] = Field(description='Strong action verbs used in resumes for the career, in the past tense')
+    professional_terms: List[str] = Field(description='Professional terms used in the career')
+    tools: List[str] = Field(description='Tools, frameworks, libraries, platforms and programming languages required in the career')
 
+
+class ExperienceATS(BaseModel):
+    job_title_count: Union[int, None] = Field('job_title_count')
+    total_work_experience_count: Union[int, None] = Field('total_work_experience')
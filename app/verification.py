@@ -0,0 +1,62 @@
+import httpx
+from decouple import config
+
+from .cache import TTLCache, SingleFlight
+from .metrics import stage, register, CallbackCounter
+
+
+URL = config("VERIFICATION_URL", default="https://quick-apply-b4e936c5c50c.herokuapp.com/api/v1/users/verifications")
+
+VERIFICATION_TIMEOUT = config("VERIFICATION_TIMEOUT", default=10.0, cast=float)
+VERIFICATION_CACHE_SIZE = config("VERIFICATION_CACHE_SIZE", default=4096, cast=int)
+VERIFICATION_CACHE_TTL = config("VERIFICATION_CACHE_TTL", default=300, cast=int)
+VERIFICATION_NEGATIVE_CACHE_TTL = config("VERIFICATION_NEGATIVE_CACHE_TTL", default=10, cast=int)
+VERIFICATION_MAX_CONNECTIONS = config("VERIFICATION_MAX_CONNECTIONS", default=20, cast=int)
+
+verification_cache = TTLCache(maxsize=VERIFICATION_CACHE_SIZE, ttl=VERIFICATION_CACHE_TTL)
+_single_flight = SingleFlight()
+register(CallbackCounter("resume_verification_cache_total", "Authorization verification cache lookups",
+                         lambda: [({"result": "hit"}, verification_cache.hits),
+                                  ({"result": "miss"}, verification_cache.misses)]))
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=VERIFICATION_TIMEOUT,
+            limits=httpx.Limits(max_connections=VERIFICATION_MAX_CONNECTIONS,
+                                max_keepalive_connections=VERIFICATION_MAX_CONNECTIONS),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _request_verification(authorization):
+    with stage("verification"):
+        verification_response = await get_client().get(url=URL, headers={"Authorization": authorization})
+    return verification_response.text == "OK"
+
+
+async def _verify_and_cache(authorization):
+    verified = await _request_verification(authorization)
+    # Rejections are cached briefly so a token that was just granted access is not locked out for long.
+    ttl = VERIFICATION_CACHE_TTL if verified else VERIFICATION_NEGATIVE_CACHE_TTL
+    verification_cache.set(authorization, verified, ttl=ttl)
+    return verified
+
+
+async def is_authorized(authorization):
+    if not authorization:
+        return False
+    verified = verification_cache.get(authorization)
+    if verified is not None:
+        return verified
+    return await _single_flight.run(authorization, lambda: _verify_and_cache(authorization))
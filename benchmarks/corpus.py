@@ -0,0 +1,124 @@
+import argparse
+import io
+import os
+import random
+
+from docx import Document
+
+# Number of work experience entries per resume size; each entry is about a third of a PDF page.
+SIZES = {"small": 2, "medium": 6, "large": 18}
+LINES_PER_PAGE = 48
+
+FIRST_NAMES = ["Jane", "John", "Amara", "Luis", "Mei", "Omar", "Priya", "Sven", "Tariq", "Zoe"]
+LAST_NAMES = ["Doe", "Okafor", "Garcia", "Chen", "Haddad", "Patel", "Larsen", "Nasser", "Kim", "Novak"]
+TITLES = ["Data Scientist", "Software Engineer", "Product Manager", "Data Analyst", "DevOps Engineer",
+          "Machine Learning Engineer", "Backend Developer", "Business Analyst"]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", "Wayne Enterprises", "Soylent"]
+VERBS = ["Led", "Built", "Designed", "Analyzed", "Deployed", "Optimized", "Automated", "Migrated", "Mentored"]
+OBJECTS = ["data pipelines", "REST APIs", "dashboards", "forecasting models", "CI/CD workflows",
+           "customer segmentation", "A/B experiments", "microservices", "ETL jobs", "recommendation systems"]
+OUTCOMES = ["reducing costs by {}%", "cutting latency by {}%", "improving accuracy by {}%",
+            "serving {} thousand users", "saving {} hours per week"]
+SKILLS = ["Python", "SQL", "Spark", "TensorFlow", "Docker", "Kubernetes", "AWS", "Terraform", "Tableau", "Go"]
+
+
+def resume_sections(rng, size):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    header = [name, f"{name.split()[0].lower()}@example.com | +1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)}"
+                    f" | linkedin.com/in/{name.replace(' ', '').lower()}"]
+    summary = [f"{rng.choice(TITLES)} with {rng.randint(2, 15)} years of experience in "
+               f"{rng.choice(OBJECTS)} and {rng.choice(OBJECTS)}."]
+    experience = []
+    for index in range(SIZES[size]):
+        start = 2023 - 2 * index
+        experience.append(f"{rng.choice(TITLES)}, {rng.choice(COMPANIES)} ({start - 2} - {start})")
+        for _ in range(rng.randint(4, 6)):
+            outcome = rng.choice(OUTCOMES).format(rng.randint(5, 60))
+            experience.append(f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} in {rng.choice(SKILLS)}, {outcome}.")
+    education = [f"BSc Computer Science, State University ({rng.randint(2005, 2015)})"]
+    skills = rng.sample(SKILLS, 6)
+    return header, summary, experience, education, skills
+
+
+def escape_pdf_text(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_bytes(lines):
+    # Minimal uncompressed PDF with one Helvetica text stream per page, enough for pypdf to extract the text.
+    pages = [lines[start:start + LINES_PER_PAGE] for start in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in pages:
+        content = "BT /F1 10 Tf 50 760 Td " + " ".join(f"({escape_pdf_text(line)}) Tj 0 -15 Td" for line in page) + " ET"
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R "
+                       f"/Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    output += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return output
+
+
+def docx_bytes(header, summary, experience, education, skills):
+    # Template-style layout: contact details in the page header and skills in a table.
+    document = Document()
+    for line in header:
+        document.sections[0].header.add_paragraph(line)
+    document.add_heading("Summary", level=1)
+    for line in summary:
+        document.add_paragraph(line)
+    document.add_heading("Experience", level=1)
+    for line in experience:
+        document.add_paragraph(line, style=None if line.endswith(")") else "List Bullet")
+    document.add_heading("Education", level=1)
+    for line in education:
+        document.add_paragraph(line)
+    document.add_heading("Skills", level=1)
+    table = document.add_table(rows=2, cols=3)
+    for cell, skill in zip(table._cells, skills):
+        cell.text = skill
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def generate(directory, count, seed=0):
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for size in SIZES:
+        for index in range(count):
+            header, summary, experience, education, skills = resume_sections(rng, size)
+            lines = header + ["", "Summary"] + summary + ["", "Experience"] + experience + \
+                ["", "Education"] + education + ["", "Skills", ", ".join(skills)]
+            documents = {"pdf": pdf_bytes(lines), "docx": docx_bytes(header, summary, experience, education, skills)}
+            for extension, data in documents.items():
+                path = os.path.join(directory, f"resume-{size}-{index:03d}.{extension}")
+                with open(path, "wb") as file:
+                    file.write(data)
+                paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic PDF and DOCX resume corpus")
+    parser.add_argument("--output", default="benchmarks/corpus")
+    parser.add_argument("--count", type=int, default=20, help="resumes per size and format")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    paths = generate(args.output, args.count, args.seed)
+    print(f"Wrote {len(paths)} resumes to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.corpus import generate
+
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile.
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))]
+
+
+def process_tree_rss(pid):
+    # Resident memory in bytes of a process and its descendants, such as the parser worker processes.
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as children:
+                    pending.extend(int(child) for child in children.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total
+
+
+async def sample_peak_rss(pid, peak, interval=0.05):
+    while True:
+        peak[0] = max(peak[0], process_tree_rss(pid))
+        await asyncio.sleep(interval)
+
+
+def start_process(arguments, env=None):
+    return subprocess.Popen([sys.executable, *arguments], env={**os.environ, **(env or {})})
+
+
+async def wait_until_ready(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout} seconds")
+
+
+async def run_level(client, url, endpoint, files, concurrency, requests, career_name):
+    latencies = []
+    errors = 0
+    next_index = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for index in next_index:
+            path = files[index % len(files)]
+            with open(path, "rb") as file:
+                upload = {"resume": (os.path.basename(path), file.read(), CONTENT_TYPES[os.path.splitext(path)[1]])}
+            data = None
+            if endpoint.startswith("/analyze"):
+                data = {"career_names" if endpoint.endswith("batch/") else "career_name": career_name}
+            started = time.perf_counter()
+            try:
+                response = await client.post(url + endpoint, files=upload, data=data,
+                                             headers={"Authorization": "benchmark"})
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"concurrency": concurrency, "requests": requests, "errors": errors,
+            "rps": requests / elapsed if elapsed else 0.0,
+            "p50": percentile(latencies, 0.50), "p95": percentile(latencies, 0.95), "p99": percentile(latencies, 0.99)}
+
+
+def format_row(row):
+    peak_rss = f"{row['peak_rss'] / 1024 / 1024:.0f}" if row.get("peak_rss") else "n/a"
+    return (f"{row['concurrency']:>11} {row['requests']:>8} {row['errors']:>6} {row['rps']:>8.2f} "
+            f"{row['p50']:>8.3f} {row['p95']:>8.3f} {row['p99']:>8.3f} {peak_rss:>13}")
+
+
+async def benchmark(args):
+    files = sorted(path for path in glob.glob(os.path.join(args.corpus, "resume-*"))
+                   if os.path.splitext(path)[1] in CONTENT_TYPES and (args.format == "all" or path.endswith(args.format)))
+    if not files:
+        files = [path for path in generate(args.corpus, count=20) if args.format == "all" or path.endswith(args.format)]
+
+    processes = []
+    app_url = args.app_url
+    app_pid = None
+    try:
+        if app_url is None:
+            stub_url = f"http://127.0.0.1:{args.stub_port}"
+            processes.append(start_process([
+                "-m", "benchmarks.stub_openai", "--port", str(args.stub_port),
+                "--chat-latency", str(args.chat_latency), "--embedding-latency", str(args.embedding_latency),
+                "--tail-probability", str(args.tail_probability), "--tail-latency", str(args.tail_latency)]))
+            await wait_until_ready(f"{stub_url}/verifications")
+            # The result cache is off by default so every request reaches the stubbed models.
+            app_env = {"OPENAI_API_KEY": "benchmark", "OPENAI_API_BASE": f"{stub_url}/v1",
+                       "VERIFICATION_URL": f"{stub_url}/verifications",
+                       "RESULT_CACHE_SIZE": "256" if args.result_cache else "0", "RESULT_CACHE_PATH": ""}
+            app = start_process(["-m", "uvicorn", "app.main:app", "--port", str(args.app_port), "--log-level",
+                                 "warning"], env=app_env)
+            processes.append(app)
+            app_pid = app.pid
+            app_url = f"http://127.0.0.1:{args.app_port}"
+        await wait_until_ready(f"{app_url}/ready")
+
+        rows = []
+        print(f"{args.endpoint} against {app_url}, {len(files)} documents")
+        print(f"{'concurrency':>11} {'requests':>8} {'errors':>6} {'rps':>8} {'p50 (s)':>8} {'p95 (s)':>8} "
+              f"{'p99 (s)':>8} {'peak RSS (MB)':>13}")
+        limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+        async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+            for concurrency in args.concurrency:
+                peak = [0]
+                sampler = asyncio.ensure_future(sample_peak_rss(app_pid, peak)) if app_pid else None
+                try:
+                    row = await run_level(client, app_url, args.endpoint, files, concurrency,
+                                          args.requests or concurrency * 10, args.career_name)
+                finally:
+                    if sampler is not None:
+                        sampler.cancel()
+                row["peak_rss"] = peak[0] or None
+                rows.append(row)
+                print(format_row(row))
+        if args.output:
+            with open(args.output, "w") as output:
+                json.dump({"endpoint": args.endpoint, "documents": len(files), "levels": rows}, output, indent=2)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /generate/ or /analyze/ against a stubbed OpenAI API")
+    parser.add_argument("--endpoint", default="/analyze/",
+                        choices=["/generate/", "/generate/stream/", "/analyze/", "/analyze/batch/"])
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")],
+                        default=[1, 4, 16], help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=0, help="requests per level, 10 per worker when unset")
+    parser.add_argument("--corpus", default="benchmarks/corpus", help="directory of resumes, generated when empty")
+    parser.add_argument("--format", default="all", choices=["all", "pdf", "docx"])
+    parser.add_argument("--career-name", default="Data Scientist")
+    parser.add_argument("--app-url", help="benchmark an app that is already running instead of starting one")
+    parser.add_argument("--app-port", type=int, default=8901)
+    parser.add_argument("--stub-port", type=int, default=8900)
+    parser.add_argument("--chat-latency", type=float, default=1.0)
+    parser.add_argument("--embedding-latency", type=float, default=0.1)
+    parser.add_argument("--tail-probability", type=float, default=0.0)
+    parser.add_argument("--tail-latency", type=float, default=10.0)
+    parser.add_argument("--result-cache", action="store_true", help="keep the result cache on")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    asyncio.run(benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
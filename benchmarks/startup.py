@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.load import start_process, wait_until_ready
+
+IMPORT_SCRIPT = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+
+
+def measure_import(runs):
+    # Each run is a fresh interpreter, so nothing is already in sys.modules.
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark")}
+    seconds = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], env=env, check=True, capture_output=True,
+                                text=True)
+        seconds.append(float(output.stdout.strip()))
+    return seconds
+
+
+def slowest_imports(top):
+    # Cumulative time of app.main's imports and of their own imports, as reported by python -X importtime.
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark")}
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], env=env, check=True,
+                            capture_output=True, text=True)
+    modules = {}
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if 1 <= depth <= 2:
+            modules[name.strip()] = int(cumulative) / 1_000_000
+    return sorted(modules.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+async def measure_ready(app_port, stub_port):
+    # Seconds from launching uvicorn until /ready passes, with the stub standing in for OpenAI and verification.
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    stub = start_process(["-m", "benchmarks.stub_openai", "--port", str(stub_port), "--embedding-latency", "0"])
+    try:
+        await wait_until_ready(f"{stub_url}/verifications")
+        started = time.perf_counter()
+        app = start_process(["-m", "uvicorn", "app.main:app", "--port", str(app_port), "--log-level", "warning"],
+                            env={"OPENAI_API_KEY": "benchmark", "OPENAI_API_BASE": f"{stub_url}/v1",
+                                 "VERIFICATION_URL": f"{stub_url}/verifications"})
+        try:
+            await wait_until_ready(f"http://127.0.0.1:{app_port}/ready", timeout=120)
+            return time.perf_counter() - started
+        finally:
+            app.terminate()
+            app.wait()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of app.main and the time until /ready")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    parser.add_argument("--ready", action="store_true", help="also start the app and time it until /ready passes")
+    parser.add_argument("--app-port", type=int, default=8901)
+    parser.add_argument("--stub-port", type=int, default=8900)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    seconds = measure_import(args.runs)
+    result = {"import_seconds": {"median": statistics.median(seconds), "min": min(seconds), "max": max(seconds)},
+              "slowest_imports": dict(slowest_imports(args.top))}
+    print(f"import app.main: median {result['import_seconds']['median']:.3f}s, "
+          f"min {result['import_seconds']['min']:.3f}s, max {result['import_seconds']['max']:.3f}s over {args.runs} runs")
+    for name, cumulative in result["slowest_imports"].items():
+        print(f"  {cumulative:8.3f}s  {name}")
+    if args.ready:
+        result["ready_seconds"] = asyncio.run(measure_ready(args.app_port, args.stub_port))
+        print(f"uvicorn start to /ready: {result['ready_seconds']:.3f}s")
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
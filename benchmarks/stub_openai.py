@@ -0,0 +1,151 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import time
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+
+from app.schemas import First, Second, Third, FirstATS, SecondATS, CareerProfile, ExperienceATS
+
+# Canned completions keyed by the first property of the JSON schema that PydanticOutputParser puts in each prompt.
+CANNED_RESPONSES = {
+    "personal_information": First(
+        personal_information={"full_name": "Jane Doe", "email": "jane.doe@example.com", "phone": "+1 555 010 2030",
+                              "address": "Springfield", "linkedin": "linkedin.com/in/janedoe",
+                              "personal_website": ""},
+        education=[{"institution": "State University", "degree": "BSc", "field_of_study": "Computer Science",
+                    "start_date": "2012", "end_date": "2016"}]),
+    "work_experience": Second(
+        work_experience=[{"company": "Acme", "position": "Data Scientist", "start_date": "2019",
+                          "end_date": "Present"},
+                         {"company": "Globex", "position": "Data Analyst", "start_date": "2016",
+                          "end_date": "2019"}],
+        certifications=[{"name": "Cloud Practitioner", "issuing_organization": "AWS", "issue_date": "2021",
+                         "expiry_date": "2024"}]),
+    "skills": Third(
+        skills=[{"name": "Python", "proficiency_level": "Expert", "years_of_experience": "7"},
+                {"name": "SQL", "proficiency_level": "Advanced", "years_of_experience": "6"}]),
+    "email_score": FirstATS(email_score="Yes", phone_score="Yes", linkedin_score="Yes"),
+    "keyword_count": SecondATS(
+        keyword_count=4, keywords=["Led", "Built", "Designed", "Analyzed"], job_title_count=2,
+        general_keyword_count=3, category_keyword_count=3, category_keywords=["Python", "SQL", "Machine Learning"],
+        total_work_experience_count=2, ats_keywords_to_add=["Deployed", "Optimized"],
+        general_keywords_to_add=["stakeholders", "experimentation"]),
+    "job_titles": CareerProfile(
+        job_titles=["Data Scientist", "Machine Learning Engineer", "Data Analyst"],
+        action_verbs=["Led", "Built", "Designed", "Analyzed", "Deployed", "Optimized"],
+        professional_terms=["stakeholders", "experimentation", "pipelines", "forecasting"],
+        tools=["Python", "SQL", "Machine Learning", "TensorFlow", "Spark"]),
+    "job_title_count": ExperienceATS(job_title_count=2, total_work_experience_count=2),
+}
+SCHEMA_PATTERN = re.compile(r'"properties": \{"(\w+)"')
+
+
+class Latency:
+    # Base delay with +/- jitter, and a slow tail that hits a fraction of the calls.
+    def __init__(self, seconds, jitter, tail_probability, tail_seconds):
+        self.seconds = seconds
+        self.jitter = jitter
+        self.tail_probability = tail_probability
+        self.tail_seconds = tail_seconds
+
+    async def wait(self):
+        if self.tail_probability and random.random() < self.tail_probability:
+            delay = self.tail_seconds
+        else:
+            delay = self.seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+        await asyncio.sleep(max(delay, 0))
+
+
+def canned_completion(messages):
+    prompt = messages[-1]["content"] if messages else ""
+    # The format instructions open with an example schema, so the real one is the last in the prompt.
+    properties = SCHEMA_PATTERN.findall(prompt)
+    if not properties or properties[-1] not in CANNED_RESPONSES:
+        return "{}"
+    return CANNED_RESPONSES[properties[-1]].json()
+
+
+def fake_embedding(value, dimensions):
+    # Deterministic unit vector per input, so identical chunks embed identically across runs.
+    seed = int.from_bytes(hashlib.sha256(json.dumps(value).encode()).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def count_words(value):
+    if isinstance(value, str):
+        return len(value.split())
+    return len(value)
+
+
+def create_app(chat_latency, embedding_latency, dimensions=1536):
+    stub = FastAPI()
+
+    @stub.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await chat_latency.wait()
+        content = canned_completion(body.get("messages", []))
+        prompt_tokens = sum(count_words(message.get("content") or "") for message in body.get("messages", []))
+        return {
+            "id": f"chatcmpl-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": count_words(content),
+                      "total_tokens": prompt_tokens + count_words(content)},
+        }
+
+    @stub.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        await embedding_latency.wait()
+        inputs = body["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        data = []
+        for index, value in enumerate(inputs):
+            vector = fake_embedding(value, dimensions)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        tokens = sum(count_words(value) for value in inputs)
+        return {"object": "list", "data": data, "model": body.get("model", "stub"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    @stub.get("/verifications", response_class=PlainTextResponse)
+    async def verifications(request: Request):
+        return "OK" if request.headers.get("Authorization") else "Unauthorized"
+
+    return stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub and verification endpoint for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--chat-latency", type=float, default=1.0, help="seconds per chat completion")
+    parser.add_argument("--embedding-latency", type=float, default=0.1, help="seconds per embeddings call")
+    parser.add_argument("--jitter", type=float, default=0.2, help="fraction of the latency added or removed at random")
+    parser.add_argument("--tail-probability", type=float, default=0.0, help="fraction of chat calls that stall")
+    parser.add_argument("--tail-latency", type=float, default=10.0, help="seconds a stalled chat call takes")
+    args = parser.parse_args()
+
+    chat_latency = Latency(args.chat_latency, args.jitter, args.tail_probability, args.tail_latency)
+    embedding_latency = Latency(args.embedding_latency, args.jitter, 0, 0)
+    uvicorn.run(create_app(chat_latency, embedding_latency), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
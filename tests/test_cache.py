@@ -0,0 +1,26 @@
+import asyncio
+
+from app.cache import ResultCache
+
+
+def test_uncacheable_values_are_shared_but_not_cached():
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"complete": len(calls) > 1}
+
+    async def run():
+        cache = ResultCache(maxsize=8, ttl=60)
+        cacheable = lambda value: value["complete"]
+        first = await asyncio.gather(*(cache.get_or_compute("key", factory, cacheable=cacheable) for _ in range(3)))
+        second = await cache.get_or_compute("key", factory, cacheable=cacheable)
+        third = await cache.get_or_compute("key", factory, cacheable=cacheable)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first == [({"complete": False}, ResultCache.MISS)] + [({"complete": False}, ResultCache.SHARED)] * 2
+    assert second == ({"complete": True}, ResultCache.MISS)
+    assert third == ({"complete": True}, ResultCache.HIT)
+    assert len(calls) == 2
@@ -0,0 +1,50 @@
+import pytest
+
+from app.calculators import TextStats, calculate_percentage, get_readability_score
+
+# (text, sentence_count, lexicon_count, syllable_count, flesch_reading_ease) as returned by textstat 0.7.3.
+TEXTSTAT_OUTPUTS = [
+    ("Led a team of five engineers. Built data pipelines in Python, reducing costs by 30%.", 2, 15, 21, 80.78),
+    ("Jane Doe\njane.doe@example.com | +1 555 010 2030\nSummary\nData Scientist with 7 years of experience in "
+     "forecasting models and A/B experiments.", 2, 21, 40, 35.44),
+    ("Designed REST APIs! Migrated ETL jobs to Spark? Mentored interns; automated CI/CD workflows.", 3, 13, 23, 50.19),
+    ("I'm a developer who's shipped microservices, dashboards and recommendation systems at Hooli's scale.",
+     1, 13, 25, 32.9),
+    ("Skills: Python, SQL, Docker, Kubernetes, AWS, Terraform", 1, 7, 11, 64.37),
+    ("Education. BSc. Computer Science, State University (2012 - 2016). GPA 3.8/4.0.", 1, 10, 19, 35.95),
+    ("Optimized customer segmentation and serving 45 thousand users... Analyzed A/B experiments — improving "
+     "accuracy by 12%.", 2, 15, 33, 13.1),
+    ("Résumé of José Müller: naïve café-style coördination, responsible for internationalization.", 1, 10, 23, 2.11),
+    ("Hi. Ok. Yes.", 1, 3, 3, 119.19),
+    ("", 1, 0, 0, 206.84),
+]
+
+
+@pytest.mark.parametrize("text, sentence_count, lexicon_count, syllable_count, flesch_reading_ease", TEXTSTAT_OUTPUTS)
+def test_matches_recorded_textstat_outputs(text, sentence_count, lexicon_count, syllable_count, flesch_reading_ease):
+    text_stats = TextStats(text)
+    assert text_stats.sentence_count == sentence_count
+    assert text_stats.lexicon_count == lexicon_count
+    assert text_stats.syllable_count == syllable_count
+    assert text_stats.flesch_reading_ease() == flesch_reading_ease
+
+
+@pytest.mark.parametrize("text", [text for text, *_ in TEXTSTAT_OUTPUTS] + [
+    " ".join(text for text, *_ in TEXTSTAT_OUTPUTS),
+    "\n".join(text for text, *_ in reversed(TEXTSTAT_OUTPUTS)),
+])
+def test_matches_textstat(text):
+    textstat = pytest.importorskip("textstat")
+    text_stats = TextStats(text)
+    assert text_stats.sentence_count == textstat.sentence_count(text)
+    assert text_stats.lexicon_count == textstat.lexicon_count(text)
+    assert text_stats.syllable_count == textstat.syllable_count(text)
+    assert text_stats.flesch_reading_ease() == textstat.flesch_reading_ease(text)
+
+
+def test_scores_from_counts():
+    text_stats = TextStats(TEXTSTAT_OUTPUTS[2][0])
+    assert get_readability_score(text_stats) == 50
+    assert get_readability_score(TextStats(TEXTSTAT_OUTPUTS[1][0])) == 35.44
+    assert calculate_percentage(text_stats, 1) == pytest.approx(100 / 3)
+    assert calculate_percentage(text_stats, 5) == 100
@@ -0,0 +1,83 @@
+import pytest
+
+from app.contacts import NO, YES, detect_contacts, detect_email, detect_phone, resolve_contacts
+
+
+@pytest.mark.parametrize("text", [
+    "jane.doe@example.com",
+    "jane [at] example [dot] com",
+    "jane(at)example(dot)co(dot)uk",
+    "jane [at] example.com",
+])
+def test_email_found(text):
+    assert detect_email(text) == YES
+
+
+@pytest.mark.parametrize("text", [
+    "Senior Developer at Microsoft dot NET platform",
+    "Worked at Acme dot com",
+    "Met targets at scale",
+])
+def test_email_not_found(text):
+    assert detect_email(text) == NO
+
+
+@pytest.mark.parametrize("text", [
+    "+1 555 010 2030",
+    "0044 20 7946 0958",
+    "Phone: 5550102030",
+    "Mobile: 06 12 34 56 78",
+    "(555) 010-2030",
+    "020 7946 0958",
+    "07911 123456",
+    "030 1234567",
+    "06 12 34 56 78",
+    "06.12.34.56.78",
+    "(030) 1234567",
+    "Jane Doe\nBerlin\n0612345678",
+])
+def test_phone_found(text):
+    assert detect_phone(text) == YES
+
+
+@pytest.mark.parametrize("text", [
+    "Data Analyst, Acme 06/2015 - 08/2017",
+    "Engineer 10/2018-03/2021",
+    "Globex 2015.06 - 2017.08",
+    "Initech (2015 - 2017)",
+    "Hooli [2015 - 2017]",
+    "Umbrella Sept 2015 - 08/2017",
+    "BSc 2012 2016",
+    "Graduated 12/06/2015",
+    "Managed a budget of $1 000 000",
+    "Raised €2 500 000 in funding",
+    "San Francisco, ZIP 94105-1234",
+    "Served 1 200 000 users",
+    "Order number 5550102030",
+    "Summary " + "x" * 300 + " order 0612345678",
+])
+def test_phone_not_found(text):
+    assert detect_phone(text) == NO
+
+
+def test_phone_ambiguous():
+    assert detect_phone("Reach me on 555 01 02 03 04") is None
+
+
+def test_ambiguous_fields_take_defaults_without_fallback():
+    contacts = detect_contacts("Reach me on 555 01 02 03 04 or on LinkedIn")
+    assert contacts == {"email_score": NO, "phone_score": None, "linkedin_score": None}
+    resolved = resolve_contacts(contacts)
+    assert (resolved.phone_score, resolved.linkedin_score) == (NO, YES)
+
+
+def test_national_numbers_in_a_header():
+    for phone in ["07911 123456", "030 1234567", "06 12 34 56 78"]:
+        resolved = resolve_contacts(detect_contacts(f"Jane Doe\njane.doe@example.com\n{phone}"))
+        assert resolved.phone_score == YES
+
+
+def test_resume_with_dates_and_no_phone():
+    text = "Jane Doe\njane.doe@example.com\nData Scientist, Acme\n06/2018 - 05/2021\nlinkedin.com/in/janedoe"
+    resolved = resolve_contacts(detect_contacts(text))
+    assert (resolved.email_score, resolved.phone_score, resolved.linkedin_score) == (YES, NO, YES)
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from app.careers import CareerProfileStore
+from app.deadlines import FALLBACK, HEDGED, OK, TIMEOUT, ChainError, latency_tracker, run_with_deadline
+from app.schemas import CareerProfile
+
+PROFILE = CareerProfile(job_titles=["Data Scientist"], action_verbs=["Led"], professional_terms=["pipelines"],
+                        tools=["Python"])
+
+
+def answer(value, seconds):
+    async def attempt():
+        await asyncio.sleep(seconds)
+        return value
+    return attempt
+
+
+def test_primary_result():
+    assert asyncio.run(run_with_deadline("test_primary", answer("primary", 0), deadline=1)) == ("primary", OK)
+
+
+def test_fallback_when_primary_fails():
+    async def failing():
+        raise RuntimeError("primary failed")
+
+    result = asyncio.run(run_with_deadline("test_failing", failing, answer("fallback", 0), deadline=1))
+    assert result == ("fallback", FALLBACK)
+
+
+def test_hedged_result(monkeypatch):
+    monkeypatch.setattr(latency_tracker, "quantile", lambda key, **kwargs: 0.05)
+    attempts = iter([answer("slow", 1), answer("fast", 0)])
+    result = asyncio.run(run_with_deadline("test_hedged", lambda: next(attempts)(), deadline=2, hedging=True))
+    assert result == ("fast", HEDGED)
+
+
+def test_timeout():
+    with pytest.raises(ChainError) as error:
+        asyncio.run(run_with_deadline("test_timeout", answer("late", 1), deadline=0.05))
+    assert error.value.status == TIMEOUT
+
+
+def test_fallback_profile_is_not_cached():
+    outcomes = iter([FALLBACK, OK, OK])
+    calls = []
+
+    async def generate(career_name):
+        calls.append(career_name)
+        return PROFILE, next(outcomes)
+
+    async def run():
+        store = CareerProfileStore(version="test")
+        results = [await store.get("Data Scientist", generate) for _ in range(3)]
+        store.close()
+        return results
+
+    assert [outcome for _, outcome in asyncio.run(run())] == [FALLBACK, OK, OK]
+    assert len(calls) == 2
@@ -0,0 +1,30 @@
+import asyncio
+
+from app.jobs import DONE, QUEUED, JobQueue
+
+
+def test_workers_wait_for_ready():
+    async def run():
+        queue = JobQueue(workers=1, tokens_per_minute=1000)
+
+        async def handler(payload):
+            return {"echo": payload["value"]}, {}
+
+        async def estimate(payload):
+            return 1
+
+        queue.register("echo", handler, estimate)
+        ready = asyncio.get_running_loop().create_future()
+        queue.start(ready=ready)
+        job_id = queue.submit("echo", "owner", {"value": 1})
+        await asyncio.sleep(0.05)
+        assert queue.get(job_id, "owner")["status"] == QUEUED
+
+        ready.set_result(None)
+        await queue.wait(job_id, 1)
+        job = queue.get(job_id, "owner")
+        await queue.stop()
+        return job
+
+    job = asyncio.run(run())
+    assert (job["status"], job["result"]) == (DONE, {"echo": 1})
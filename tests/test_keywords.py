@@ -0,0 +1,45 @@
+from app.keywords import KeywordMatcher, normalize_keyword, tokenize
+
+
+def test_tokenize_keeps_tool_names():
+    assert [token for token, _, _ in tokenize("C++, C#, Node.js and Jane's résumé.")] == \
+        ["c++", "c#", "node.js", "and", "jane's", "résumé"]
+
+
+def test_tokenize_splits_slashes_and_hyphens():
+    assert normalize_keyword("Python/SQL") == ("python", "sql")
+    assert normalize_keyword("machine-learning") == ("machine", "learning")
+    assert normalize_keyword("CI/CD") == ("ci", "cd")
+
+
+def test_slash_and_hyphen_lists():
+    text = "Python/SQL, AWS/GCP, TensorFlow/PyTorch, machine-learning and CI/CD pipelines"
+    counts = KeywordMatcher(["SQL", "AWS", "PyTorch", "Machine Learning", "CI/CD", "CI-CD"]).count(tokenize(text))
+    assert counts == {"SQL": 1, "AWS": 1, "PyTorch": 1, "Machine Learning": 1, "CI/CD": 1, "CI-CD": 1}
+
+
+def test_multi_word_and_overlapping_keywords():
+    text = "Machine learning engineer. Deep learning and machine learning research."
+    counts = KeywordMatcher(["machine learning", "learning", "Learning", "deep learning", "research"]).count(
+        tokenize(text))
+    assert counts == {"machine learning": 2, "learning": 3, "Learning": 3, "deep learning": 1, "research": 1}
+
+
+def test_failure_links():
+    # After "data data" fails to continue into "data science" at the first token, the matcher must fall back to
+    # the second "data" rather than restart, and "big data pipeline" must still find "data pipeline".
+    text = "data data science big data pipeline"
+    counts = KeywordMatcher(["data science", "big data platform", "data pipeline", "data"]).count(tokenize(text))
+    assert counts == {"data science": 1, "big data platform": 0, "data pipeline": 1, "data": 3}
+
+
+def test_positions():
+    text = "Led ML teams; machine-learning and Machine Learning."
+    positions = KeywordMatcher(["machine learning", "Led"]).positions(tokenize(text))
+    assert positions == {"machine learning": [(14, 30), (35, 51)], "Led": [(0, 3)]}
+    assert [text[start:end] for start, end in positions["machine learning"]] == ["machine-learning",
+                                                                                 "Machine Learning"]
+
+
+def test_empty_keywords_are_ignored():
+    assert KeywordMatcher(["", "  ", "SQL"]).count(tokenize("SQL")) == {"SQL": 1}